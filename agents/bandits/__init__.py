@@ -1,9 +1,13 @@
 from agents.bandits.epsilon_greedy import (
     EpsilonGreedy,
     EpsilonGreedyConstantStepSize,
+    BatchEpsilonGreedy,
+    BatchEpsilonGreedyConstantStepSize,
 )
-from agents.bandits.gradient_bandit import GradientBandit
+from agents.bandits.gradient_bandit import GradientBandit, BatchGradientBandit
 from agents.bandits.bayesian_sampler import (
     BayesianSamplerValuePrior,
     BayesianSamplerBroadPrior,
+    BatchBayesianSamplerValuePrior,
+    BatchBayesianSamplerBroadPrior,
 )
@@ -7,3 +7,10 @@ class _BanditAgent:
 
     def get_name(self):
         raise NotImplementedError
+
+class _BatchBanditAgent(_BanditAgent):
+    def choose_action(self):
+        raise NotImplementedError
+
+    def update(self, actions, rewards):
+        raise NotImplementedError
@@ -1,5 +1,5 @@
 import numpy as np
-from agents.bandits.bandit_agent import _BanditAgent
+from agents.bandits.bandit_agent import _BanditAgent, _BatchBanditAgent
 
 class _BayesianSampler(_BanditAgent):
     def __init__(self, num_actions=10, rng=None):
@@ -12,6 +12,10 @@ class _BayesianSampler(_BanditAgent):
         self._likelihood_mean = np.zeros(num_actions)
         self._likelihood_mean_square = np.zeros(num_actions)
         self._likelihood_var = np.ones(num_actions)
+        self._likelihood_mean_sum = 0
+        self._likelihood_mean_square_sum = 0
+        self._data_precision = np.zeros(num_actions)
+        self._data_weighted_mean = np.zeros(num_actions)
 
         if rng is None:
             self._rng = np.random.default_rng()
@@ -23,20 +27,10 @@ class _BayesianSampler(_BanditAgent):
         if self._prior_var == 0:
             return self._rng.choice(self._num_actions)
 
-        posterior_var = (
-            1.0 / (
-                (self._num_action_tries / self._likelihood_var)
-                + (1.0 / self._prior_var)
-            )
-        )
+        prior_precision = 1.0 / self._prior_var
+        posterior_var = 1.0 / (self._data_precision + prior_precision)
         posterior_mean = (
-            (
-                (
-                    self._num_action_tries * self._likelihood_mean
-                    / self._likelihood_var
-                )
-                + (self._prior_mean / self._prior_var)
-            )
+            (self._data_weighted_mean + (self._prior_mean * prior_precision))
             * posterior_var
         )
 
@@ -45,6 +39,7 @@ class _BayesianSampler(_BanditAgent):
         return action
 
     def update(self, action, reward):
+        old_likelihood_mean = self._likelihood_mean[action]
         self._num_action_tries[action] += 1
         self._likelihood_mean[action] += (
             (reward - self._likelihood_mean[action])
@@ -54,15 +49,37 @@ class _BayesianSampler(_BanditAgent):
             ((reward * reward) - self._likelihood_mean_square[action])
             / self._num_action_tries[action]
         )
+        new_likelihood_mean = self._likelihood_mean[action]
+        self._likelihood_mean_sum += new_likelihood_mean - old_likelihood_mean
+        self._likelihood_mean_square_sum += (
+            (new_likelihood_mean * new_likelihood_mean)
+            - (old_likelihood_mean * old_likelihood_mean)
+        )
         self._likelihood_var[action] = (
             self._likelihood_mean_square[action]
             - np.square(self._likelihood_mean[action])
         )
         if self._likelihood_var[action] == 0:
-            self._likelihood_var[action] = np.var(self._likelihood_mean)
+            self._likelihood_var[action] = self._get_likelihood_mean_var()
+
+        self._data_precision[action] = (
+            self._num_action_tries[action] / self._likelihood_var[action]
+        )
+        self._data_weighted_mean[action] = (
+            self._num_action_tries[action] * self._likelihood_mean[action]
+            / self._likelihood_var[action]
+        )
 
         self._set_prior(reward)
 
+    def _get_likelihood_mean_mean(self):
+        return self._likelihood_mean_sum / self._num_actions
+
+    def _get_likelihood_mean_var(self):
+        mean = self._get_likelihood_mean_mean()
+        mean_square = self._likelihood_mean_square_sum / self._num_actions
+        return max(mean_square - (mean * mean), 0)
+
     def _set_prior(self, reward):
         raise NotImplementedError
 
@@ -84,8 +101,125 @@ class BayesianSamplerBroadPrior(_BayesianSampler):
 
 class BayesianSamplerValuePrior(_BayesianSampler):
     def _set_prior(self, reward):
-        self._prior_mean = np.mean(self._likelihood_mean)
-        self._prior_var = np.var(self._likelihood_mean)
+        self._prior_mean = self._get_likelihood_mean_mean()
+        self._prior_var = self._get_likelihood_mean_var()
+
+    def get_name(self):
+        return "Bayesian sampler (value prior)"
+
+class _BatchBayesianSampler(_BatchBanditAgent):
+    def __init__(self, n_envs, num_actions=10, rng=None):
+        self._n_envs = n_envs
+        self._num_actions = num_actions
+        self._env_inds = np.arange(n_envs)
+        self._step = 0
+        self._num_action_tries = np.zeros([n_envs, num_actions], dtype=int)
+        self._prior_mean = np.zeros(n_envs)
+        self._prior_mean_square = np.zeros(n_envs)
+        self._prior_var = np.zeros(n_envs)
+        self._likelihood_mean = np.zeros([n_envs, num_actions])
+        self._likelihood_mean_square = np.zeros([n_envs, num_actions])
+        self._likelihood_var = np.ones([n_envs, num_actions])
+        self._likelihood_mean_sum = np.zeros(n_envs)
+        self._likelihood_mean_square_sum = np.zeros(n_envs)
+        self._data_precision = np.zeros([n_envs, num_actions])
+        self._data_weighted_mean = np.zeros([n_envs, num_actions])
+
+        if rng is None:
+            self._rng = np.random.default_rng()
+        else:
+            self._rng = rng
+
+    def choose_action(self):
+        has_prior = (self._prior_var != 0)
+        prior_var = np.where(has_prior, self._prior_var, 1).reshape(-1, 1)
+        prior_precision = 1.0 / prior_var
+        prior_mean = self._prior_mean.reshape(-1, 1)
+
+        posterior_var = 1.0 / (self._data_precision + prior_precision)
+        posterior_mean = (
+            (self._data_weighted_mean + (prior_mean * prior_precision))
+            * posterior_var
+        )
+
+        samples = self._rng.normal(posterior_mean, np.sqrt(posterior_var))
+        sampled_actions = np.argmax(samples, axis=1)
+        random_actions = self._rng.integers(
+            self._num_actions,
+            size=self._n_envs,
+        )
+        actions = np.where(has_prior, sampled_actions, random_actions)
+        return actions
+
+    def update(self, actions, rewards):
+        inds = (self._env_inds, actions)
+        old_likelihood_mean = self._likelihood_mean[inds]
+        self._num_action_tries[inds] += 1
+        self._likelihood_mean[inds] += (
+            (rewards - self._likelihood_mean[inds])
+            / self._num_action_tries[inds]
+        )
+        self._likelihood_mean_square[inds] += (
+            ((rewards * rewards) - self._likelihood_mean_square[inds])
+            / self._num_action_tries[inds]
+        )
+        new_likelihood_mean = self._likelihood_mean[inds]
+        self._likelihood_mean_sum += new_likelihood_mean - old_likelihood_mean
+        self._likelihood_mean_square_sum += (
+            np.square(new_likelihood_mean)
+            - np.square(old_likelihood_mean)
+        )
+        likelihood_var = (
+            self._likelihood_mean_square[inds]
+            - np.square(new_likelihood_mean)
+        )
+        likelihood_var = np.where(
+            likelihood_var == 0,
+            self._get_likelihood_mean_var(),
+            likelihood_var,
+        )
+        self._likelihood_var[inds] = likelihood_var
+        self._data_precision[inds] = (
+            self._num_action_tries[inds] / likelihood_var
+        )
+        self._data_weighted_mean[inds] = (
+            self._num_action_tries[inds] * new_likelihood_mean
+            / likelihood_var
+        )
+
+        self._set_prior(rewards)
+
+    def _get_likelihood_mean_mean(self):
+        return self._likelihood_mean_sum / self._num_actions
+
+    def _get_likelihood_mean_var(self):
+        mean = self._get_likelihood_mean_mean()
+        mean_square = self._likelihood_mean_square_sum / self._num_actions
+        return np.maximum(mean_square - np.square(mean), 0)
+
+    def _set_prior(self, rewards):
+        raise NotImplementedError
+
+class BatchBayesianSamplerBroadPrior(_BatchBayesianSampler):
+    def _set_prior(self, rewards):
+        self._step += 1
+        self._prior_mean += (rewards - self._prior_mean) / self._step
+        self._prior_mean_square += (
+            ((rewards * rewards) - self._prior_mean_square)
+            / self._step
+        )
+        self._prior_var = (
+            self._prior_mean_square
+            - np.square(self._prior_mean)
+        )
+
+    def get_name(self):
+        return "Bayesian sampler (broad prior)"
+
+class BatchBayesianSamplerValuePrior(_BatchBayesianSampler):
+    def _set_prior(self, rewards):
+        self._prior_mean = self._get_likelihood_mean_mean()
+        self._prior_var = self._get_likelihood_mean_var()
 
     def get_name(self):
         return "Bayesian sampler (value prior)"
@@ -1,5 +1,5 @@
 import numpy as np
-from agents.bandits.bandit_agent import _BanditAgent
+from agents.bandits.bandit_agent import _BanditAgent, _BatchBanditAgent
 
 class EpsilonGreedy(_BanditAgent):
     def __init__(
@@ -27,16 +27,11 @@ class EpsilonGreedy(_BanditAgent):
     def choose_action(self):
         is_greedy = (self._rng.random() > self._epsilon)
         if is_greedy:
-            optimal_value = max(self._value_estimates)
-            optimal_action_list = [
-                a
-                for a, value in enumerate(self._value_estimates)
-                if value == optimal_value
-            ]
-            if len(optimal_action_list) == 1:
-                action = optimal_action_list[0]
-            else:
-                action = self._rng.choice(optimal_action_list)
+            action = np.argmax(self._value_estimates)
+            optimal_value = self._value_estimates[action]
+            is_optimal = (self._value_estimates == optimal_value)
+            if np.count_nonzero(is_optimal) > 1:
+                action = self._rng.choice(np.flatnonzero(is_optimal))
         else:
             action = self._rng.integers(self._value_estimates.size)
 
@@ -65,3 +60,76 @@ class EpsilonGreedyConstantStepSize(EpsilonGreedy):
             % (self._epsilon, self._step_size)
         )
         return name
+
+class BatchEpsilonGreedy(_BatchBanditAgent):
+    def __init__(
+        self,
+        n_envs,
+        epsilon=0.02,
+        step_size=0.3,
+        num_actions=10,
+        initial_value_estimates=None,
+        rng=None,
+    ):
+        self._n_envs = n_envs
+        self._num_actions = num_actions
+        self._env_inds = np.arange(n_envs)
+        self._epsilon = epsilon
+        self._step_size = step_size
+        self._num_action_tries = np.zeros([n_envs, num_actions], dtype=int)
+
+        if initial_value_estimates is None:
+            self._value_estimates = np.zeros([n_envs, num_actions])
+        else:
+            self._value_estimates = np.zeros([n_envs, num_actions])
+            self._value_estimates[:] = initial_value_estimates
+
+        if rng is None:
+            self._rng = np.random.default_rng()
+        else:
+            self._rng = rng
+
+    def choose_action(self):
+        is_greedy = (self._rng.random(self._n_envs) > self._epsilon)
+        is_optimal = (
+            self._value_estimates
+            == np.max(self._value_estimates, axis=1, keepdims=True)
+        )
+        tie_breaks = self._rng.random([self._n_envs, self._num_actions])
+        greedy_actions = np.argmax(
+            np.where(is_optimal, tie_breaks, -1),
+            axis=1,
+        )
+        random_actions = self._rng.integers(
+            self._num_actions,
+            size=self._n_envs,
+        )
+        actions = np.where(is_greedy, greedy_actions, random_actions)
+
+        self._num_action_tries[self._env_inds, actions] += 1
+        return actions
+
+    def update(self, actions, rewards):
+        inds = (self._env_inds, actions)
+        self._value_estimates[inds] += (
+            (rewards - self._value_estimates[inds])
+            / self._num_action_tries[inds]
+        )
+
+    def get_name(self):
+        name = "$\\varepsilon$-greedy$(\\varepsilon=%.2f)$" % self._epsilon
+        return name
+
+class BatchEpsilonGreedyConstantStepSize(BatchEpsilonGreedy):
+    def update(self, actions, rewards):
+        inds = (self._env_inds, actions)
+        self._value_estimates[inds] += (
+            self._step_size * (rewards - self._value_estimates[inds])
+        )
+
+    def get_name(self):
+        name = (
+            "$\\varepsilon$-greedy$(\\varepsilon=%.2f,\\alpha=%.2f)$"
+            % (self._epsilon, self._step_size)
+        )
+        return name
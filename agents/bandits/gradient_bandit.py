@@ -1,5 +1,5 @@
 import numpy as np
-from agents.bandits.bandit_agent import _BanditAgent
+from agents.bandits.bandit_agent import _BanditAgent, _BatchBanditAgent
 
 class GradientBandit(_BanditAgent):
     def __init__(self, step_size=0.5, num_actions=10, rng=None):
@@ -8,6 +8,8 @@ class GradientBandit(_BanditAgent):
         self._step = 1
         self._mean_reward = 0
         self._action_preferences = np.zeros(num_actions)
+        self._p = np.zeros(num_actions)
+        self._cdf = np.zeros(num_actions)
 
         if rng is None:
             self._rng = np.random.default_rng()
@@ -15,17 +17,60 @@ class GradientBandit(_BanditAgent):
             self._rng = rng
 
     def choose_action(self):
-        e = np.exp(self._action_preferences)
-        self._p = e / sum(e)
-        action = self._rng.choice(self._num_actions, p=self._p)
-        return action
+        max_preference = self._action_preferences.max()
+        np.subtract(self._action_preferences, max_preference, out=self._p)
+        np.exp(self._p, out=self._p)
+        self._p /= self._p.sum()
+        self._p.cumsum(out=self._cdf)
+        u = self._rng.random() * self._cdf[-1]
+        action = self._cdf.searchsorted(u, side="right")
+        return min(action, self._num_actions - 1)
 
     def update(self, action, reward):
         self._mean_reward += (reward - self._mean_reward) / self._step
         self._step += 1
         inc = self._step_size * (reward - self._mean_reward)
         self._action_preferences[action] += inc
-        self._action_preferences -= inc * self._p
+        np.multiply(self._p, inc, out=self._cdf)
+        self._action_preferences -= self._cdf
+
+    def get_name(self):
+        name = "Gradient bandit$(\\alpha=%.2f)$" % self._step_size
+        return name
+
+class BatchGradientBandit(_BatchBanditAgent):
+    def __init__(self, n_envs, step_size=0.5, num_actions=10, rng=None):
+        self._n_envs = n_envs
+        self._num_actions = num_actions
+        self._env_inds = np.arange(n_envs)
+        self._step_size = step_size
+        self._step = 1
+        self._mean_reward = np.zeros(n_envs)
+        self._action_preferences = np.zeros([n_envs, num_actions])
+
+        if rng is None:
+            self._rng = np.random.default_rng()
+        else:
+            self._rng = rng
+
+    def choose_action(self):
+        e = np.exp(
+            self._action_preferences
+            - np.max(self._action_preferences, axis=1, keepdims=True)
+        )
+        self._p = e / np.sum(e, axis=1, keepdims=True)
+        cdf = np.cumsum(self._p, axis=1)
+        u = self._rng.random([self._n_envs, 1]) * cdf[:, -1:]
+        actions = np.sum(cdf <= u, axis=1)
+        actions = np.minimum(actions, self._num_actions - 1)
+        return actions
+
+    def update(self, actions, rewards):
+        self._mean_reward += (rewards - self._mean_reward) / self._step
+        self._step += 1
+        inc = self._step_size * (rewards - self._mean_reward)
+        self._action_preferences[self._env_inds, actions] += inc
+        self._action_preferences -= inc.reshape(-1, 1) * self._p
 
     def get_name(self):
         name = "Gradient bandit$(\\alpha=%.2f)$" % self._step_size
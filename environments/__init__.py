@@ -1 +1 @@
-from environments.k_armed_bandit import KArmedBandit
+from environments.k_armed_bandit import KArmedBandit, BatchKArmedBandit
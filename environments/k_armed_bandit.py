@@ -1,22 +1,67 @@
 import numpy as np
 
 class KArmedBandit:
-    def __init__(self, k=10, rng=None, mean_reward=0):
+    def __init__(self, k=10, rng=None, mean_reward=0, noise_buffer_size=None):
         if rng is None:
             self._rng = np.random.default_rng()
         else:
             self._rng = rng
 
         self._action_values = self._rng.normal(loc=mean_reward, size=k)
-        self._optimal_actions = [
-            a for a, value in enumerate(self._action_values)
-            if value == max(self._action_values)
-        ]
+        max_value = np.max(self._action_values)
+        self._optimal_action_mask = (self._action_values == max_value)
+        self._regret = max_value - self._action_values
+
+        self._noise_buffer_size = noise_buffer_size
+        self._noise_ind = noise_buffer_size
 
     def step(self, action):
         action_value = self._action_values[action]
-        reward = self._rng.normal(action_value)
-        return reward
+        if self._noise_buffer_size is None:
+            reward = self._rng.normal(action_value)
+            return reward
+
+        if self._noise_ind >= self._noise_buffer_size:
+            self._noise_buffer = self._rng.standard_normal(
+                self._noise_buffer_size
+            ).tolist()
+            self._noise_ind = 0
+
+        noise = self._noise_buffer[self._noise_ind]
+        self._noise_ind += 1
+        return action_value + noise
 
     def is_optimal_action(self, action):
-        return (action in self._optimal_actions)
+        return self._optimal_action_mask[action]
+
+    def regret(self, action):
+        return self._regret[action]
+
+class BatchKArmedBandit:
+    def __init__(self, n_envs, k=10, rng=None, mean_reward=0):
+        if rng is None:
+            self._rng = np.random.default_rng()
+        else:
+            self._rng = rng
+
+        self.n_envs = n_envs
+        self.k = k
+        self._env_inds = np.arange(n_envs)
+        self._action_values = self._rng.normal(
+            loc=mean_reward,
+            size=[n_envs, k],
+        )
+        max_values = np.max(self._action_values, axis=1, keepdims=True)
+        self._optimal_action_mask = (self._action_values == max_values)
+        self._regret = max_values - self._action_values
+
+    def step(self, actions):
+        action_values = self._action_values[self._env_inds, actions]
+        rewards = self._rng.normal(action_values)
+        return rewards
+
+    def is_optimal_action(self, actions):
+        return self._optimal_action_mask[self._env_inds, actions]
+
+    def regret(self, actions):
+        return self._regret[self._env_inds, actions]
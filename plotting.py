@@ -106,6 +106,40 @@ class HVSpan(FillBetween):
         if self._ylims is not None:
             axis.axhspan(*self._ylims, **self._kwargs)
 
+class Heatmap(Line):
+    def __init__(
+        self,
+        z,
+        x_tick_labels=None,
+        y_tick_labels=None,
+        colorbar_label=None,
+        **kwargs,
+    ):
+        self._z = z
+        self._x_tick_labels = x_tick_labels
+        self._y_tick_labels = y_tick_labels
+        self._colorbar_label = colorbar_label
+        self._kwargs = kwargs
+
+    def plot(self, axis):
+        image = axis.imshow(
+            self._z,
+            origin="lower",
+            aspect="auto",
+            **self._kwargs,
+        )
+        if self._x_tick_labels is not None:
+            axis.set_xticks(range(len(self._x_tick_labels)))
+            axis.set_xticklabels(self._x_tick_labels)
+        if self._y_tick_labels is not None:
+            axis.set_yticks(range(len(self._y_tick_labels)))
+            axis.set_yticklabels(self._y_tick_labels)
+
+        axis.figure.colorbar(image, ax=axis, label=self._colorbar_label)
+
+    def has_label(self):
+        return False
+
 class ColourPicker:
     def __init__(self, num_colours, cyclic=True, cmap_name=None):
         if cmap_name is None:
@@ -0,0 +1,98 @@
+"""
+MIT License
+
+Copyright (c) 2022 JAKE LEVI
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import time
+import numpy as np
+import environments
+
+def run(
+    agent,
+    env,
+    num_steps,
+    reward_array=None,
+    optimal_choice_array=None,
+    phase_timer=None,
+):
+    if isinstance(env, environments.BatchKArmedBandit):
+        shape = [env.n_envs, num_steps]
+    else:
+        shape = [num_steps]
+
+    if reward_array is None:
+        reward_array = np.zeros(shape)
+    if optimal_choice_array is None:
+        optimal_choice_array = np.zeros(shape, bool)
+
+    if phase_timer is not None:
+        _run_timed(
+            agent,
+            env,
+            num_steps,
+            reward_array,
+            optimal_choice_array,
+            phase_timer,
+        )
+        return reward_array, optimal_choice_array
+
+    for j in range(num_steps):
+        action = agent.choose_action()
+        reward = env.step(action)
+        agent.update(action, reward)
+        reward_array[..., j] = reward
+        optimal_choice_array[..., j] = env.is_optimal_action(action)
+
+    return reward_array, optimal_choice_array
+
+def _run_timed(
+    agent,
+    env,
+    num_steps,
+    reward_array,
+    optimal_choice_array,
+    phase_timer,
+):
+    t_choose = 0
+    t_step = 0
+    t_update = 0
+    t_record = 0
+    for j in range(num_steps):
+        t_0 = time.perf_counter()
+        action = agent.choose_action()
+        t_1 = time.perf_counter()
+        reward = env.step(action)
+        t_2 = time.perf_counter()
+        agent.update(action, reward)
+        t_3 = time.perf_counter()
+        reward_array[..., j] = reward
+        optimal_choice_array[..., j] = env.is_optimal_action(action)
+        t_4 = time.perf_counter()
+        t_choose += t_1 - t_0
+        t_step += t_2 - t_1
+        t_update += t_3 - t_2
+        t_record += t_4 - t_3
+
+    phase_timer.add("choose_action", t_choose, num_steps)
+    phase_timer.add("step", t_step, num_steps)
+    phase_timer.add("update", t_update, num_steps)
+    phase_timer.add("record", t_record, num_steps)
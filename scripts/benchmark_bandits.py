@@ -0,0 +1,388 @@
+import argparse
+import os
+import json
+import datetime
+import time
+import numpy as np
+if __name__ == "__main__":
+    import __init__
+import environments
+import sweep
+import util
+import compare_bandits
+import param_sweep_bandits
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def benchmark_agent(agent_type, batch, k, args):
+    rng = util.Seeder(stateless=True).get_rng(agent_type.__name__, k)
+    if batch:
+        n_envs = args.n_envs
+        agent = agent_type(n_envs, num_actions=k, rng=rng)
+        env = environments.BatchKArmedBandit(n_envs, k=k, rng=rng)
+    else:
+        n_envs = 1
+        agent = agent_type(num_actions=k, rng=rng)
+        env = environments.KArmedBandit(k=k, rng=rng)
+
+    t_choose = 0
+    t_step = 0
+    t_update = 0
+    for _ in range(args.num_calls):
+        t_0 = time.perf_counter()
+        action = agent.choose_action()
+        t_1 = time.perf_counter()
+        reward = env.step(action)
+        t_2 = time.perf_counter()
+        agent.update(action, reward)
+        t_3 = time.perf_counter()
+        t_choose += t_1 - t_0
+        t_step += t_2 - t_1
+        t_update += t_3 - t_2
+
+    t_total = t_choose + t_step + t_update
+    result = {
+        "agent": agent_type.__name__,
+        "batch": batch,
+        "k": k,
+        "n_envs": n_envs,
+        "num_calls": args.num_calls,
+        "choose_action_us": 1e6 * t_choose / args.num_calls,
+        "step_us": 1e6 * t_step / args.num_calls,
+        "update_us": 1e6 * t_update / args.num_calls,
+        "steps_per_second": n_envs * args.num_calls / t_total,
+    }
+    return result
+
+def benchmark_env_step(k, noise_buffer_size, args):
+    rng = util.Seeder(stateless=True).get_rng("KArmedBandit", k)
+    env = environments.KArmedBandit(
+        k=k,
+        rng=rng,
+        noise_buffer_size=noise_buffer_size,
+    )
+    action_list = rng.integers(k, size=args.num_calls).tolist()
+
+    t_start = time.perf_counter()
+    for action in action_list:
+        env.step(action)
+    t_total = time.perf_counter() - t_start
+
+    result = {
+        "k": k,
+        "noise_buffer_size": noise_buffer_size,
+        "num_calls": args.num_calls,
+        "step_us": 1e6 * t_total / args.num_calls,
+        "steps_per_second": args.num_calls / t_total,
+    }
+    return result
+
+def benchmark_compare_bandits(batch, num_steps, args):
+    main_args = argparse.Namespace(
+        batch=batch,
+        batch_size=None,
+        num_steps=num_steps,
+        num_repeats=args.num_repeats,
+        seed=0,
+        noise_buffer_size=None,
+        reward_dtype="float64",
+        store_arrays=True,
+        profile_phases=False,
+        save=False,
+    )
+    agent_result_list = compare_bandits.get_agent_result_list(main_args)
+
+    t_start = time.perf_counter()
+    compare_bandits.main(agent_result_list, main_args)
+    t_total = time.perf_counter() - t_start
+
+    num_env_steps = len(agent_result_list) * args.num_repeats * num_steps
+    result = {
+        "batch": batch,
+        "num_steps": num_steps,
+        "num_repeats": args.num_repeats,
+        "seconds": t_total,
+        "steps_per_second": num_env_steps / t_total,
+    }
+    return result
+
+def benchmark_param_sweep(num_steps, args):
+    experiment = param_sweep_bandits.TestEpsilonGreedy(
+        num_steps,
+        util.Seeder(),
+    )
+    sweeper = sweep.ParamSweeper(
+        experiment,
+        n_repeats=args.num_sweep_repeats,
+        verbose=False,
+        printer=util.Printer(print_to_console=False),
+    )
+    sweeper.add_parameter(
+        sweep.Parameter(
+            "epsilon",
+            0.1,
+            sweep.get_range(0.01, 0.6, args.num_sweep_values, log_space=True),
+        )
+    )
+
+    t_start = time.perf_counter()
+    sweeper.find_best_parameters()
+    t_total = time.perf_counter() - t_start
+
+    num_experiments = sum(
+        len(results_list)
+        for results_list in sweeper._params_to_results_dict.values()
+    )
+    result = {
+        "num_steps": num_steps,
+        "num_repeats": args.num_sweep_repeats,
+        "num_values": args.num_sweep_values,
+        "num_experiments": num_experiments,
+        "seconds": t_total,
+        "experiments_per_second": num_experiments / t_total,
+        "steps_per_second": num_experiments * num_steps / t_total,
+    }
+    return result
+
+def main(args):
+    agent_result_list = []
+    for agent_type, batch_agent_type in compare_bandits.AGENT_TYPE_PAIRS:
+        for k in args.k_list:
+            for t, batch in [[agent_type, False], [batch_agent_type, True]]:
+                result = benchmark_agent(t, batch, k, args)
+                print(
+                    "%-35s k = %-6i choose_action = %9.2f us, step = %9.2f "
+                    "us, update = %9.2f us, steps/s = %.3g"
+                    % (
+                        result["agent"],
+                        k,
+                        result["choose_action_us"],
+                        result["step_us"],
+                        result["update_us"],
+                        result["steps_per_second"],
+                    )
+                )
+                agent_result_list.append(result)
+
+    env_result_list = []
+    for k in args.k_list:
+        for noise_buffer_size in [None, args.noise_buffer_size]:
+            result = benchmark_env_step(k, noise_buffer_size, args)
+            print(
+                "%-35s k = %-6i noise_buffer_size = %-6s step = %9.2f us, "
+                "steps/s = %.3g"
+                % (
+                    "KArmedBandit",
+                    k,
+                    noise_buffer_size,
+                    result["step_us"],
+                    result["steps_per_second"],
+                )
+            )
+            env_result_list.append(result)
+
+    compare_bandits_result_list = []
+    param_sweep_result_list = []
+    for num_steps in args.num_steps_list:
+        for batch in [True, False]:
+            result = benchmark_compare_bandits(batch, num_steps, args)
+            print(
+                "compare_bandits.main (batch = %s, num_steps = %i): %.2fs, "
+                "steps/s = %.3g"
+                % (
+                    batch,
+                    num_steps,
+                    result["seconds"],
+                    result["steps_per_second"],
+                )
+            )
+            compare_bandits_result_list.append(result)
+
+        result = benchmark_param_sweep(num_steps, args)
+        print(
+            "ParamSweeper (num_steps = %i): %i experiments in %.2fs, "
+            "steps/s = %.3g"
+            % (
+                num_steps,
+                result["num_experiments"],
+                result["seconds"],
+                result["steps_per_second"],
+            )
+        )
+        param_sweep_result_list.append(result)
+
+    benchmark_results = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "numpy_version": np.__version__,
+        "agents": agent_result_list,
+        "environments": env_result_list,
+        "compare_bandits": compare_bandits_result_list,
+        "param_sweep": param_sweep_result_list,
+    }
+    if not os.path.isdir(os.path.dirname(args.output_filename)):
+        os.makedirs(os.path.dirname(args.output_filename))
+    with open(args.output_filename, "w") as f:
+        json.dump(benchmark_results, f, indent=4)
+    print("\nSaved benchmark results in \"%s\"" % args.output_filename)
+
+    if args.baseline_filename is not None:
+        compare_to_baseline(benchmark_results, args.baseline_filename)
+
+def compare_to_baseline(benchmark_results, baseline_filename):
+    with open(baseline_filename, "r") as f:
+        baseline_results = json.load(f)
+
+    print("\nSteps per second relative to \"%s\":" % baseline_filename)
+    baseline_agent_dict = {
+        (r["agent"], r["k"], r["n_envs"]): r
+        for r in baseline_results["agents"]
+    }
+    for result in benchmark_results["agents"]:
+        key = (result["agent"], result["k"], result["n_envs"])
+        if key in baseline_agent_dict:
+            print(
+                "%-35s k = %-6i %.2fx"
+                % (
+                    result["agent"],
+                    result["k"],
+                    result["steps_per_second"]
+                    / baseline_agent_dict[key]["steps_per_second"],
+                )
+            )
+    baseline_env_dict = {
+        (r["k"], r["noise_buffer_size"]): r
+        for r in baseline_results.get("environments", [])
+    }
+    for result in benchmark_results["environments"]:
+        key = (result["k"], result["noise_buffer_size"])
+        if key in baseline_env_dict:
+            print(
+                "%-35s k = %-6i noise_buffer_size = %-6s %.2fx"
+                % (
+                    "KArmedBandit",
+                    result["k"],
+                    result["noise_buffer_size"],
+                    result["steps_per_second"]
+                    / baseline_env_dict[key]["steps_per_second"],
+                )
+            )
+    baseline_compare_bandits_dict = {
+        (r["batch"], r["num_steps"]): r
+        for r in baseline_results["compare_bandits"]
+    }
+    for result in benchmark_results["compare_bandits"]:
+        key = (result["batch"], result["num_steps"])
+        if key in baseline_compare_bandits_dict:
+            print(
+                "compare_bandits.main (batch = %s, num_steps = %i): %.2fx"
+                % (
+                    result["batch"],
+                    result["num_steps"],
+                    result["steps_per_second"]
+                    / baseline_compare_bandits_dict[key]["steps_per_second"],
+                )
+            )
+    baseline_param_sweep_dict = {
+        r["num_steps"]: r
+        for r in baseline_results["param_sweep"]
+    }
+    for result in benchmark_results["param_sweep"]:
+        key = result["num_steps"]
+        if key in baseline_param_sweep_dict:
+            print(
+                "ParamSweeper (num_steps = %i): %.2fx"
+                % (
+                    result["num_steps"],
+                    result["steps_per_second"]
+                    / baseline_param_sweep_dict[key]["steps_per_second"],
+                )
+            )
+
+if __name__ == "__main__":
+    # Define CLI using argparse
+    parser = argparse.ArgumentParser(
+        description="Benchmark bandit agents and environments"
+    )
+
+    parser.add_argument(
+        "--output_filename",
+        help="Name of JSON file in which benchmark results should be saved "
+        "(by default a timestamped file in Results/Benchmarks)",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--baseline_filename",
+        help="If present, compare steps per second against the benchmark "
+        "results saved in this JSON file by a previous run of this script",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--k_list",
+        help="Numbers of actions for which to benchmark each agent",
+        default=[10, 100, 1000],
+        type=int,
+        nargs="+",
+    )
+    parser.add_argument(
+        "--num_calls",
+        help="Number of calls to choose_action, step and update to time for "
+        "each agent and number of actions",
+        default=1000,
+        type=int,
+    )
+    parser.add_argument(
+        "--n_envs",
+        help="Number of environments in each batch when benchmarking batched "
+        "agents",
+        default=100,
+        type=int,
+    )
+    parser.add_argument(
+        "--noise_buffer_size",
+        help="Size of the noise buffer with which KArmedBandit.step is "
+        "benchmarked, in addition to benchmarking it without a noise buffer",
+        default=1000,
+        type=int,
+    )
+    parser.add_argument(
+        "--num_steps_list",
+        help="Numbers of time steps in each rollout for which to run the "
+        "end-to-end benchmarks",
+        default=[100, 1000],
+        type=int,
+        nargs="+",
+    )
+    parser.add_argument(
+        "--num_repeats",
+        help="Number of repeats for the end-to-end compare_bandits benchmark",
+        default=20,
+        type=int,
+    )
+    parser.add_argument(
+        "--num_sweep_repeats",
+        help="Number of repeats for the ParamSweeper benchmark",
+        default=5,
+        type=int,
+    )
+    parser.add_argument(
+        "--num_sweep_values",
+        help="Number of parameter values for the ParamSweeper benchmark",
+        default=5,
+        type=int,
+    )
+
+    # Parse arguments
+    args = parser.parse_args()
+
+    if args.output_filename is None:
+        args.output_filename = os.path.join(
+            CURRENT_DIR,
+            "Results",
+            "Benchmarks",
+            "benchmark_%s.json"
+            % datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
+        )
+
+    util.time_func(main, args)
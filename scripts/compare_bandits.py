@@ -7,39 +7,245 @@ if __name__ == "__main__":
 import agents
 import environments
 import plotting
+import rollout
 import util
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+AGGREGATE_ONLY_BATCH_SIZE = 100
+AGENT_TYPE_PAIRS = [
+    [
+        agents.bandits.EpsilonGreedy,
+        agents.bandits.BatchEpsilonGreedy,
+    ],
+    [
+        agents.bandits.EpsilonGreedyConstantStepSize,
+        agents.bandits.BatchEpsilonGreedyConstantStepSize,
+    ],
+    [
+        agents.bandits.GradientBandit,
+        agents.bandits.BatchGradientBandit,
+    ],
+    [
+        agents.bandits.BayesianSamplerValuePrior,
+        agents.bandits.BatchBayesianSamplerValuePrior,
+    ],
+    [
+        agents.bandits.BayesianSamplerBroadPrior,
+        agents.bandits.BatchBayesianSamplerBroadPrior,
+    ],
+]
 
 class AgentResult:
-    def __init__(self, agent_type, name, num_steps, num_repeats):
+    def __init__(
+        self,
+        agent_type,
+        name,
+        num_steps,
+        num_repeats,
+        batch_agent_type=None,
+        reward_array=None,
+        optimal_choice_array=None,
+        reward_dtype=np.float64,
+        store_arrays=True,
+    ):
         self.construcor = agent_type
+        self.batch_construcor = batch_agent_type
         self.name = name
-        self.reward_array = np.zeros([num_repeats, num_steps])
-        self.optimal_choice_array = np.zeros([num_repeats, num_steps])
+        if store_arrays and (reward_array is None):
+            reward_array = np.zeros([num_repeats, num_steps], reward_dtype)
+        if store_arrays and (optimal_choice_array is None):
+            optimal_choice_array = np.zeros([num_repeats, num_steps], bool)
+
+        self.reward_array = reward_array
+        self.optimal_choice_array = optimal_choice_array
+        self.reward_stats = util.RunningStatistics(num_steps)
+        self.optimal_choice_stats = util.RunningStatistics(num_steps)
+
+    def get_output_arrays(self, inds):
+        if self.reward_array is None:
+            return None, None
+
+        return self.reward_array[inds], self.optimal_choice_array[inds]
+
+    def update_stats(self, reward_array, optimal_choice_array):
+        self.reward_stats.update(reward_array)
+        self.optimal_choice_stats.update(optimal_choice_array)
 
     def get_mean_std_reward(self):
-        self.mean_reward = np.mean(self.reward_array, axis=0)
-        self.std_reward = np.std(self.reward_array, axis=0)
+        if self.reward_array is not None:
+            self.mean_reward = np.mean(self.reward_array, 0, np.float64)
+            self.std_reward = np.std(self.reward_array, 0, np.float64)
+            self.percent_optimal_choice = 100 * np.mean(
+                self.optimal_choice_array,
+                axis=0,
+            )
+        else:
+            self.mean_reward = self.reward_stats.mean
+            self.std_reward = self.reward_stats.get_std()
+            self.percent_optimal_choice = 100 * self.optimal_choice_stats.mean
+
+def get_agent_result_list(args):
+    agent_result_list = [
+        AgentResult(
+            agent_type,
+            agent_type().get_name(),
+            args.num_steps,
+            args.num_repeats,
+            batch_agent_type,
+            reward_dtype=np.dtype(args.reward_dtype),
+            store_arrays=args.store_arrays,
+        )
+        for agent_type, batch_agent_type in AGENT_TYPE_PAIRS
+    ]
+    return agent_result_list
+
+def get_array_result(agent_result_list, args):
+    array_dict = dict()
+    agent_list = []
+    for i, agent_result in enumerate(agent_result_list):
+        if agent_result.reward_array is not None:
+            array_dict["%i_reward_array" % i] = agent_result.reward_array
+            array_dict["%i_optimal_choice_array" % i] = (
+                agent_result.optimal_choice_array
+            )
+        array_dict["%i_reward_mean" % i] = agent_result.reward_stats.mean
+        array_dict["%i_reward_m2" % i] = agent_result.reward_stats.m2
+        array_dict["%i_optimal_choice_mean" % i] = (
+            agent_result.optimal_choice_stats.mean
+        )
+        agent_list.append(
+            {
+                "agent_type": agent_result.construcor.__name__,
+                "batch_agent_type": agent_result.batch_construcor.__name__,
+                "name": agent_result.name,
+            }
+        )
+
+    metadata = {
+        "num_steps": args.num_steps,
+        "num_repeats": args.num_repeats,
+        "seed": args.seed,
+        "agents": agent_list,
+    }
+    return util.ArrayResult(args.save_data_filename, array_dict, metadata)
+
+def load_array_result(dir_name):
+    array_dict, metadata = util.ArrayResult(dir_name).load()
+    agent_result_list = []
+    for i, agent_dict in enumerate(metadata["agents"]):
+        agent_result = AgentResult(
+            getattr(agents.bandits, agent_dict["agent_type"]),
+            agent_dict["name"],
+            metadata["num_steps"],
+            metadata["num_repeats"],
+            getattr(agents.bandits, agent_dict["batch_agent_type"]),
+            array_dict.get("%i_reward_array" % i),
+            array_dict.get("%i_optimal_choice_array" % i),
+            store_arrays=False,
+        )
+        agent_result.reward_stats.n = metadata["num_repeats"]
+        agent_result.reward_stats.mean = array_dict["%i_reward_mean" % i]
+        agent_result.reward_stats.m2 = array_dict["%i_reward_m2" % i]
+        agent_result.optimal_choice_stats.n = metadata["num_repeats"]
+        agent_result.optimal_choice_stats.mean = (
+            array_dict["%i_optimal_choice_mean" % i]
+        )
+        agent_result_list.append(agent_result)
+
+    return agent_result_list, metadata["num_steps"], metadata["num_repeats"]
+
+def get_seed_sequence(args, *spawn_key):
+    seeder = util.Seeder(stateless=True)
+    return seeder.get_seed_sequence(
+        "compare_bandits",
+        args.seed,
+        spawn_key=spawn_key,
+    )
+
+def get_rng(args, *spawn_key):
+    return np.random.default_rng(get_seed_sequence(args, *spawn_key))
+
+def get_batch_rng(args, repeat_range, *spawn_key):
+    return util.BatchGenerator(
+        [get_seed_sequence(args, i, *spawn_key) for i in repeat_range]
+    )
 
 def main(agent_result_list, args):
+    if args.profile_phases:
+        phase_timer = util.PhaseTimer()
+    else:
+        phase_timer = None
+
+    if args.save:
+        printer = util.Printer("progress.txt", args.results_dir)
+    else:
+        printer = util.Printer()
+
+    progress_reporter = util.ProgressReporter(
+        args.num_repeats * len(agent_result_list),
+        name="rollouts",
+        steps_per_item=args.num_steps,
+        printer=printer,
+    )
+
+    if args.batch:
+        run_batch(agent_result_list, args, phase_timer, progress_reporter)
+    else:
+        run_scalar(agent_result_list, args, phase_timer, progress_reporter)
+
+    if phase_timer is not None:
+        printer("\nTime spent in each phase of the rollouts:")
+        phase_timer.print_summary(printer)
+
+    printer.close()
+
+def run_batch(agent_result_list, args, phase_timer, progress_reporter):
+    if args.batch_size is not None:
+        batch_size = args.batch_size
+    elif args.store_arrays:
+        batch_size = args.num_repeats
+    else:
+        batch_size = AGGREGATE_ONLY_BATCH_SIZE
+
+    for i_lo in range(0, args.num_repeats, batch_size):
+        i_hi = min(i_lo + batch_size, args.num_repeats)
+        repeat_range = range(i_lo, i_hi)
+        for j, agent_result in enumerate(agent_result_list):
+            env = environments.BatchKArmedBandit(
+                i_hi - i_lo,
+                rng=get_batch_rng(args, repeat_range, 0),
+            )
+            agent = agent_result.batch_construcor(
+                i_hi - i_lo,
+                rng=get_batch_rng(args, repeat_range, j + 1),
+            )
+            reward_array, optimal_choice_array = rollout.run(
+                agent,
+                env,
+                args.num_steps,
+                *agent_result.get_output_arrays(slice(i_lo, i_hi)),
+                phase_timer=phase_timer,
+            )
+            agent_result.update_stats(reward_array, optimal_choice_array)
+            progress_reporter.update(i_hi - i_lo)
+
+def run_scalar(agent_result_list, args, phase_timer, progress_reporter):
     for i in range(args.num_repeats):
-        if ((i + 1) % 10) == 0:
-            print(
-                "Performing repeat %i/%i..."
-                % (i + 1, args.num_repeats), end="\r"
+        for j, agent_result in enumerate(agent_result_list):
+            env = environments.KArmedBandit(
+                rng=get_rng(args, i, 0),
+                noise_buffer_size=args.noise_buffer_size,
             )
-        env = environments.KArmedBandit()
-        for agent_result in agent_result_list:
-            agent = agent_result.construcor()
-
-            for j in range(args.num_steps):
-                action = agent.choose_action()
-                reward = env.step(action)
-                agent.update(action, reward)
-                agent_result.reward_array[i, j] = reward
-                if env.is_optimal_action(action):
-                    agent_result.optimal_choice_array[i, j] = 1
+            agent = agent_result.construcor(rng=get_rng(args, i, j + 1))
+            reward_array, optimal_choice_array = rollout.run(
+                agent,
+                env,
+                args.num_steps,
+                *agent_result.get_output_arrays(i),
+                phase_timer=phase_timer,
+            )
+            agent_result.update_stats(reward_array, optimal_choice_array)
+            progress_reporter.update()
 
 def plot(agent_result_list, args):
     t = np.arange(args.num_steps)
@@ -49,6 +255,10 @@ def plot(agent_result_list, args):
     cp = plotting.ColourPicker(len(agent_result_list))
     for a in agent_result_list:
         a.get_mean_std_reward()
+    has_reward_arrays = all(
+        agent_result.reward_array is not None
+        for agent_result in agent_result_list
+    )
     rewards_line_list = [
         plotting.Line(
             t,
@@ -58,6 +268,7 @@ def plot(agent_result_list, args):
             **marker_props,
         )
         for i, agent_result in enumerate(agent_result_list)
+        if has_reward_arrays
     ]
     mean_reward_line_list = [
         plotting.Line(
@@ -83,7 +294,7 @@ def plot(agent_result_list, args):
     percent_optimal_choice_line_list = [
         plotting.Line(
             t,
-            100 * np.mean(agent_result.optimal_choice_array, axis=0),
+            agent_result.percent_optimal_choice,
             color=cp(i),
             label=agent_result.name,
             **line_props,
@@ -91,7 +302,7 @@ def plot(agent_result_list, args):
         for i, agent_result in enumerate(agent_result_list)
     ]
     mean_reward_list = [
-        np.mean(agent_result.reward_array)
+        np.mean(agent_result.mean_reward)
         for agent_result in agent_result_list
     ]
     mean_reward_bar_list = [
@@ -113,12 +324,12 @@ def plot(agent_result_list, args):
         label="Max reward (%s)" % agent_result_list[argmax_reward].name,
     )
     plotting.plot(
-        mean_reward_line_list,
-        (
+        *mean_reward_line_list,
+        plot_name=(
             "10-armed bandit mean rewards (%i steps, %i repeats)"
             % (args.num_steps, args.num_repeats)
         ),
-        args.results_dir,
+        dir_name=args.results_dir,
         axis_properties=plotting.AxisProperties(
             "Time",
             "Reward",
@@ -128,38 +339,40 @@ def plot(agent_result_list, args):
         legend_properties=plotting.LegendProperties(0.4),
         figsize=[12, 6],
     )
+    if has_reward_arrays:
+        plotting.plot(
+            *[
+                line
+                for line_pair in zip(rewards_line_list, mean_reward_line_list)
+                for line in line_pair
+            ],
+            plot_name=(
+                "10 armed bandit rewards (%i steps, %i repeats)"
+                % (args.num_steps, args.num_repeats)
+            ),
+            dir_name=args.results_dir,
+            axis_properties=plotting.AxisProperties(
+                "Time",
+                "Reward",
+                None,
+                [-2, 4],
+            ),
+            legend_properties=plotting.LegendProperties(0.4),
+            figsize=[12, 6],
+        )
+
     plotting.plot(
-        [
-            line
-            for line_pair in zip(rewards_line_list, mean_reward_line_list)
-            for line in line_pair
-        ],
-        (
-            "10 armed bandit rewards (%i steps, %i repeats)"
-            % (args.num_steps, args.num_repeats)
-        ),
-        args.results_dir,
-        axis_properties=plotting.AxisProperties(
-            "Time",
-            "Reward",
-            None,
-            [-2, 4],
-        ),
-        legend_properties=plotting.LegendProperties(0.4),
-        figsize=[12, 6],
-    )
-    plotting.plot(
-        [
+        *[
             line
             for line_pair in zip(mean_reward_line_list, std_reward_fb_list)
             for line in line_pair
         ],
-        (
+        plot_name=(
             "10 armed bandit rewards "
             "(mean and variance, %i steps, %i repeats)"
             % (args.num_steps, args.num_repeats)
         ),
-        args.results_dir,
+        dir_name=args.results_dir,
         axis_properties=plotting.AxisProperties(
             "Time",
             "Reward",
@@ -170,13 +383,13 @@ def plot(agent_result_list, args):
         figsize=[12, 6],
     )
     plotting.plot(
-        percent_optimal_choice_line_list,
-        (
+        *percent_optimal_choice_line_list,
+        plot_name=(
             "10 armed bandit percentage of optimal actions "
             "(%i steps, %i repeats)"
             % (args.num_steps, args.num_repeats)
         ),
-        args.results_dir,
+        dir_name=args.results_dir,
         axis_properties=plotting.AxisProperties(
             "Time",
             "% Optimal action",
@@ -186,13 +399,14 @@ def plot(agent_result_list, args):
         legend_properties=plotting.LegendProperties(),
     )
     plotting.plot(
-        mean_reward_bar_list + [max_mean_reward_hline],
-        (
+        *mean_reward_bar_list,
+        max_mean_reward_hline,
+        plot_name=(
             "10 armed bandit total mean rewards "
             "(%i steps, %i repeats)"
             % (args.num_steps, args.num_repeats)
         ),
-        args.results_dir,
+        dir_name=args.results_dir,
         axis_properties=plotting.AxisProperties(
             "Agent type",
             "Mean reward",
@@ -214,15 +428,17 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--save_data_filename",
-        help="Filename in which new results should be saved (this argument is "
-        "ignored if --load_data_filename is present)",
+        help="Name of directory in which new results should be saved, as one "
+        "memory-mappable .npy file per array plus a JSON manifest (this "
+        "argument is ignored if --load_data_filename is present)",
         default=None,
         type=str,
     )
     parser.add_argument(
         "--load_data_filename",
         help="If present, do not perform any new experiments, and instead "
-        "load data from the specified filename and plot the results",
+        "load data from the specified directory (or from a pickle file saved "
+        "by a previous version of this script) and plot the results",
         default=None,
         type=str,
     )
@@ -240,6 +456,64 @@ if __name__ == "__main__":
         action="store_false",
         dest="plot",
     )
+    parser.add_argument(
+        "--no_batch",
+        help="If this argument is present, each repeat is simulated "
+        "separately using the scalar (non-batched) agents and environment, "
+        "instead of simulating all repeats at once as a single batch",
+        action="store_false",
+        dest="batch",
+    )
+    parser.add_argument(
+        "--reward_dtype",
+        help="Data type used to store rewards. Optimal action choices are "
+        "always stored as booleans",
+        default="float64",
+        choices=["float64", "float32"],
+        type=str,
+    )
+    parser.add_argument(
+        "--aggregate_only",
+        help="If this argument is present, only running per-time-step "
+        "statistics of the rewards and optimal action choices are kept, "
+        "instead of storing every reward for every repeat, and (unless "
+        "--batch_size is present) repeats are simulated in batches of %i, "
+        "so that memory usage does not grow with the number of repeats"
+        % AGGREGATE_ONLY_BATCH_SIZE,
+        action="store_false",
+        dest="store_arrays",
+    )
+    parser.add_argument(
+        "--batch_size",
+        help="Maximum number of repeats to simulate at once as a single "
+        "batch (by default all repeats are simulated in one batch, or "
+        "batches of %i repeats with --aggregate_only)"
+        % AGGREGATE_ONLY_BATCH_SIZE,
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--noise_buffer_size",
+        help="If present (and --no_batch is present), each environment draws "
+        "its reward noise in blocks of this many samples, instead of "
+        "drawing one sample per time step",
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--profile_phases",
+        help="If this argument is present, the cumulative time and number of "
+        "calls spent choosing actions, stepping environments, updating agents "
+        "and recording results are measured and printed after the rollouts",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--seed",
+        help="Seed from which the random number generators for every "
+        "environment and agent are derived",
+        default=0,
+        type=int,
+    )
     parser.add_argument(
         "--num_steps",
         help="Number of time steps to simulate for each rollout",
@@ -260,7 +534,10 @@ if __name__ == "__main__":
     # args.results_dir hasn't been provided, args.num_steps and
     # args.num_repeats need to be loaded before args.results_dir is set
     if args.load_data_filename is not None:
-        result_data = util.Result(args.load_data_filename).load()
+        if os.path.isdir(args.load_data_filename):
+            result_data = load_array_result(args.load_data_filename)
+        else:
+            result_data = util.Result(args.load_data_filename).load()
         agent_result_list, args.num_steps, args.num_repeats = result_data
 
     if args.results_dir is None:
@@ -275,25 +552,10 @@ if __name__ == "__main__":
         if args.save_data_filename is None:
             args.save_data_filename = os.path.join(
                 args.results_dir,
-                "bandit_data.pkl",
-            )
-        agent_result_list = [
-            AgentResult(
-                agent_type,
-                agent_type().get_name(),
-                args.num_steps,
-                args.num_repeats,
+                "bandit_data",
             )
-            for agent_type in [
-                agents.bandits.EpsilonGreedy,
-                agents.bandits.EpsilonGreedyConstantStepSize,
-                agents.bandits.GradientBandit,
-                agents.bandits.BayesianSamplerValuePrior,
-                agents.bandits.BayesianSamplerBroadPrior,
-            ]
-        ]
-        result_data = [agent_result_list, args.num_steps, args.num_repeats]
-        result = util.Result(args.save_data_filename, result_data)
+        agent_result_list = get_agent_result_list(args)
+        result = get_array_result(agent_result_list, args)
         with result.get_context(save=args.save):
             util.time_func(main, agent_result_list, args)
 
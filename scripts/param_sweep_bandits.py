@@ -6,48 +6,148 @@ if __name__ == "__main__":
     import __init__
 import agents
 import environments
+import rollout
 import sweep
 import util
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class _TestBanditAgent(sweep.Experiment):
-    def get_agent(self, **kwargs):
+    def get_agent(self, rng, **kwargs):
         raise NotImplementedError()
 
-    def __init__(self, num_steps, seeder):
+    def get_batch_agent(self, n_envs, rng, **kwargs):
+        raise NotImplementedError()
+
+    def __init__(
+        self,
+        num_steps,
+        seeder,
+        phase_timer=None,
+        noise_buffer_size=None,
+    ):
         self._num_steps = num_steps
         self._seeder = seeder
+        self._seed = None
+        self.phase_timer = phase_timer
+        self._noise_buffer_size = noise_buffer_size
 
-    def run(self, **kwargs):
-        env = environments.KArmedBandit()
-        agent = self.get_agent(**kwargs)
-        total_reward = 0
+    def set_seed(self, seed):
+        self._seed = seed
+
+    def get_identity(self):
+        if self._noise_buffer_size is None:
+            return "%s(num_steps=%i)" % (type(self).__name__, self._num_steps)
+
+        return "%s(num_steps=%i, noise_buffer_size=%i)" % (
+            type(self).__name__,
+            self._num_steps,
+            self._noise_buffer_size,
+        )
+
+    def get_num_steps(self):
+        return self._num_steps
 
-        for _ in range(self._num_steps):
-            action = agent.choose_action()
-            reward = env.step(action)
-            agent.update(action, reward)
-            total_reward += reward
+    def get_fidelity(self):
+        return self._num_steps
 
-        mean_reward = total_reward / self._num_steps
+    def set_fidelity(self, fidelity):
+        self._num_steps = fidelity
+
+    def run(self, **kwargs):
+        if self._seed is None:
+            seed = self._seeder.get_seed(self.get_identity(), kwargs)
+        else:
+            seed = self._seed
+
+        seed_sequence = np.random.SeedSequence(seed)
+        env_seed_sequence, agent_seed_sequence = seed_sequence.spawn(2)
+        env = environments.KArmedBandit(
+            rng=np.random.default_rng(env_seed_sequence),
+            noise_buffer_size=self._noise_buffer_size,
+        )
+        agent = self.get_agent(
+            rng=np.random.default_rng(agent_seed_sequence),
+            **kwargs,
+        )
+        reward_array, _ = rollout.run(
+            agent,
+            env,
+            self._num_steps,
+            phase_timer=self.phase_timer,
+        )
+        mean_reward = np.mean(reward_array)
         return mean_reward
 
+    def run_batch(self, param_dict_list, seed_list_list):
+        n_repeats = len(seed_list_list[0])
+        n_envs = len(param_dict_list) * n_repeats
+        env_seed_sequence_list = []
+        agent_seed_sequence_list = []
+        for seed_list in seed_list_list:
+            for seed in seed_list:
+                seed_sequence = np.random.SeedSequence(seed)
+                env_seed_sequence, agent_seed_sequence = seed_sequence.spawn(2)
+                env_seed_sequence_list.append(env_seed_sequence)
+                agent_seed_sequence_list.append(agent_seed_sequence)
+
+        env = environments.BatchKArmedBandit(
+            n_envs,
+            rng=util.BatchGenerator(env_seed_sequence_list),
+        )
+        param_vector_dict = {
+            name: np.repeat(
+                [param_dict[name] for param_dict in param_dict_list],
+                n_repeats,
+            )
+            for name in param_dict_list[0]
+        }
+        agent = self.get_batch_agent(
+            n_envs,
+            rng=util.BatchGenerator(agent_seed_sequence_list),
+            **param_vector_dict,
+        )
+        reward_array, _ = rollout.run(
+            agent,
+            env,
+            self._num_steps,
+            phase_timer=self.phase_timer,
+        )
+        mean_reward = np.mean(reward_array, axis=1)
+        mean_reward = mean_reward.reshape(len(param_dict_list), n_repeats)
+        return mean_reward.tolist()
+
 class TestEpsilonGreedy(_TestBanditAgent):
-    def get_agent(self, epsilon):
-        return agents.bandits.EpsilonGreedy(epsilon)
+    def get_agent(self, rng, epsilon):
+        return agents.bandits.EpsilonGreedy(epsilon, rng=rng)
+
+    def get_batch_agent(self, n_envs, rng, epsilon):
+        return agents.bandits.BatchEpsilonGreedy(n_envs, epsilon, rng=rng)
 
 class TestEpsilonGreedyConstantStepSize(_TestBanditAgent):
-    def get_agent(self, epsilon, step_size):
+    def get_agent(self, rng, epsilon, step_size):
         agent = agents.bandits.EpsilonGreedyConstantStepSize(
             epsilon,
             step_size,
+            rng=rng,
+        )
+        return agent
+
+    def get_batch_agent(self, n_envs, rng, epsilon, step_size):
+        agent = agents.bandits.BatchEpsilonGreedyConstantStepSize(
+            n_envs,
+            epsilon,
+            step_size,
+            rng=rng,
         )
         return agent
 
 class TestGradientBandit(_TestBanditAgent):
-    def get_agent(self, step_size):
-        return agents.bandits.GradientBandit(step_size)
+    def get_agent(self, rng, step_size):
+        return agents.bandits.GradientBandit(step_size, rng=rng)
+
+    def get_batch_agent(self, n_envs, rng, step_size):
+        return agents.bandits.BatchGradientBandit(n_envs, step_size, rng=rng)
 
 def main(args):
     filename_list_list = [
@@ -60,90 +160,128 @@ def main(args):
         print(*filename_list, sep="\n", end="\n\n")
 
 
-def test_epsilon_greedy(args):
-    seeder = util.Seeder()
-    experiment = TestEpsilonGreedy(args.num_steps, seeder)
+def get_phase_timer(args):
+    if args.profile_phases:
+        return util.PhaseTimer()
+    else:
+        return None
+
+def get_param_sweeper(experiment, results_dir, args):
     param_sweeper = sweep.ParamSweeper(
         experiment,
         n_repeats=args.num_repeats,
-        print_every=50,
+        n_workers=args.num_workers,
+        result_cache=args.result_cache,
+        checkpoint_filename=os.path.join(results_dir, "checkpoint.pkl"),
+        race_sigma=args.race_sigma,
+        fidelity_eta=args.fidelity_eta,
+        min_fidelity=args.min_num_steps,
+        vectorise=args.vectorise,
+    )
+    return param_sweeper
+
+def find_best_parameters(param_sweeper, experiment, results_dir, args):
+    checkpoint_filename = os.path.join(results_dir, "checkpoint.pkl")
+    if args.resume and os.path.isfile(checkpoint_filename):
+        param_sweeper.load_checkpoint(checkpoint_filename)
+
+    if args.grid:
+        best_parameters = param_sweeper.grid_sweep()
+    elif args.bayesian_iterations is None:
+        best_parameters = param_sweeper.find_best_parameters()
+    else:
+        best_parameters = param_sweeper.find_best_parameters_bayesian(
+            n_iterations=args.bayesian_iterations,
+        )
+
+    if experiment.phase_timer is not None:
+        print("\nTime spent in each phase of the rollouts:")
+        experiment.phase_timer.print_summary()
+
+    return best_parameters
+
+def test_epsilon_greedy(args):
+    seeder = util.Seeder()
+    experiment = TestEpsilonGreedy(
+        args.num_steps,
+        seeder,
+        get_phase_timer(args),
+        args.noise_buffer_size,
     )
+    results_dir = os.path.join(args.results_dir, "Epsilon_greedy")
+    param_sweeper = get_param_sweeper(experiment, results_dir, args)
 
     param_sweeper.add_parameter(
         sweep.Parameter(
             "epsilon",
             0.1,
-            val_lo=0.01,
-            val_hi=0.6,
-            val_num=args.num_values,
-            log_space=True,
+            sweep.get_range(0.01, 0.6, args.num_values, log_space=True),
+            log_x_axis=True,
         )
     )
-    param_sweeper.find_best_parameters()
-    results_dir = os.path.join(args.results_dir, "Epsilon_greedy")
+    find_best_parameters(param_sweeper, experiment, results_dir, args)
     return param_sweeper.plot("Epsilon greedy", results_dir)
 
 def test_epsilon_greedy_constant_step_size(args):
     seeder = util.Seeder()
-    experiment = TestEpsilonGreedyConstantStepSize(args.num_steps, seeder)
-    param_sweeper = sweep.ParamSweeper(
-        experiment,
-        n_repeats=args.num_repeats,
-        print_every=50,
+    experiment = TestEpsilonGreedyConstantStepSize(
+        args.num_steps,
+        seeder,
+        get_phase_timer(args),
+        args.noise_buffer_size,
     )
+    results_dir = os.path.join(
+        args.results_dir,
+        "Epsilon_greedy_constant_step_size",
+    )
+    param_sweeper = get_param_sweeper(experiment, results_dir, args)
 
     param_sweeper.add_parameter(
         sweep.Parameter(
             "epsilon",
             0.1,
-            val_lo=0.01,
-            val_hi=0.6,
-            val_num=args.num_values,
-            log_space=True,
+            sweep.get_range(0.01, 0.6, args.num_values, log_space=True),
+            log_x_axis=True,
         )
     )
     param_sweeper.add_parameter(
         sweep.Parameter(
             "step_size",
             0.1,
-            val_lo=0.01,
-            val_hi=1,
-            val_num=args.num_values,
-            log_space=True,
+            sweep.get_range(0.01, 1, args.num_values, log_space=True),
+            log_x_axis=True,
         )
     )
-    param_sweeper.find_best_parameters()
-    results_dir = os.path.join(
-        args.results_dir,
-        "Epsilon_greedy_constant_step_size",
-    )
+    find_best_parameters(param_sweeper, experiment, results_dir, args)
     experiment_name = "Epsilon greedy (constant step size)"
-    return param_sweeper.plot(experiment_name, results_dir)
+    filename_list = param_sweeper.plot(experiment_name, results_dir)
+    if args.grid:
+        filename_list += param_sweeper.plot_grid(experiment_name, results_dir)
+    return filename_list
 
 def test_gradient_bandit(args):
     seeder = util.Seeder()
-    experiment = TestGradientBandit(args.num_steps, seeder)
-    param_sweeper = sweep.ParamSweeper(
-        experiment,
-        n_repeats=args.num_repeats,
-        print_every=50,
+    experiment = TestGradientBandit(
+        args.num_steps,
+        seeder,
+        get_phase_timer(args),
+        args.noise_buffer_size,
     )
+    results_dir = os.path.join(
+        args.results_dir,
+        "Gradient_bandit",
+    )
+    param_sweeper = get_param_sweeper(experiment, results_dir, args)
 
     param_sweeper.add_parameter(
         sweep.Parameter(
             "step_size",
             0.1,
-            val_lo=0.01,
-            val_hi=1,
-            val_num=args.num_values,
-            log_space=True,
+            sweep.get_range(0.01, 1, args.num_values, log_space=True),
+            log_x_axis=True,
         )
     )
-    param_sweeper.find_best_parameters()
-    results_dir = os.path.join(
-        args.results_dir,
-        "Gradient_bandit",
-    )
+    find_best_parameters(param_sweeper, experiment, results_dir, args)
     experiment_name = "Gradient bandit"
     return param_sweeper.plot(experiment_name, results_dir)
 
@@ -177,8 +315,115 @@ if __name__ == "__main__":
         type=int,
     )
 
+    parser.add_argument(
+        "--noise_buffer_size",
+        help="If present (and --vectorise is not present), each environment "
+        "draws its reward noise in blocks of this many samples, instead of "
+        "drawing one sample per time step",
+        default=None,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--num_workers",
+        help="If present, distribute the repeats of each experiment over a "
+        "pool of this many worker processes",
+        default=None,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--cache_filename",
+        help="If present, store the results of every experiment in this "
+        "SQLite file, and reuse results from previous runs of this script "
+        "instead of repeating experiments",
+        default=None,
+        type=str,
+    )
+
+    parser.add_argument(
+        "--race_sigma",
+        help="If present, the repeats of each experiment are run in rounds, "
+        "and values which are worse than the current best value by more than "
+        "this many standard errors are eliminated before all repeats are run",
+        default=None,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--fidelity_eta",
+        help="If present, new values of each parameter are first evaluated "
+        "with shorter rollouts, and only the best 1/fidelity_eta of the "
+        "values are promoted to rollouts which are fidelity_eta times longer, "
+        "until the best values are evaluated with num_steps steps",
+        default=None,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--min_num_steps",
+        help="Number of steps in the shortest rollouts used when "
+        "--fidelity_eta is present (by default num_steps/fidelity_eta^2)",
+        default=None,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--bayesian_iterations",
+        help="If present, search for the best parameters using Bayesian "
+        "optimisation with this many iterations (fitting a Gaussian process "
+        "over all parameters jointly), instead of sweeping over one "
+        "parameter at a time",
+        default=None,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--grid",
+        help="If this argument is present, every combination of parameter "
+        "values is evaluated in one bulk sweep over the full-factorial grid "
+        "(combined with --vectorise or --num_workers if present), and "
+        "heatmaps of the results are plotted for each pair of parameters",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--vectorise",
+        help="If this argument is present, all values and repeats of each "
+        "parameter sweep are simulated at once as a single batched rollout, "
+        "using batched agents with a different parameter value in each row",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--profile_phases",
+        help="If this argument is present, the cumulative time and number of "
+        "calls spent choosing actions, stepping environments, updating agents "
+        "and recording results are measured and printed after each sweep "
+        "(not supported with --num_workers, because timings measured in "
+        "worker processes are not sent back to the main process)",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--resume",
+        help="If this argument is present, each parameter search (including "
+        "--grid and --bayesian_iterations searches) is resumed from the last "
+        "checkpoint saved in the results directory (if one exists), instead "
+        "of starting from scratch",
+        action="store_true",
+    )
+
     # Parse arguments
     args = parser.parse_args()
+    if args.profile_phases and (args.num_workers is not None):
+        parser.error("--profile_phases is not supported with --num_workers")
+    if args.vectorise and (args.num_workers is not None):
+        parser.error("--vectorise is not supported with --num_workers")
+    if (args.fidelity_eta is not None) and (args.fidelity_eta <= 1):
+        parser.error("--fidelity_eta must be greater than 1")
+    if (args.min_num_steps is not None) and (args.min_num_steps <= 0):
+        parser.error("--min_num_steps must be greater than 0")
 
     if args.results_dir is None:
         args.results_dir = os.path.join(
@@ -190,4 +435,9 @@ if __name__ == "__main__":
             % (args.num_repeats, args.num_steps, args.num_values),
         )
 
+    if args.cache_filename is not None:
+        args.result_cache = sweep.ResultCache(args.cache_filename)
+    else:
+        args.result_cache = None
+
     util.time_func(main, args)
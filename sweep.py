@@ -22,6 +22,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import os
+import json
+import time
+import math
+import pickle
+import itertools
+import sqlite3
+import concurrent.futures
 import numpy as np
 import util
 import plotting
@@ -68,6 +76,68 @@ class Experiment:
     def run(self, **kwargs):
         raise NotImplementedError()
 
+    def run_batch(self, param_dict_list, seed_list_list):
+        raise NotImplementedError()
+
+    def set_seed(self, seed):
+        return
+
+    def get_identity(self):
+        return type(self).__name__
+
+    def get_num_steps(self):
+        return None
+
+    def get_fidelity(self):
+        return None
+
+    def set_fidelity(self, fidelity):
+        raise NotImplementedError()
+
+class ResultCache:
+    def __init__(self, filename):
+        dir_name = os.path.dirname(os.path.abspath(filename))
+        if not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+
+        self._connection = sqlite3.connect(filename)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "experiment TEXT, "
+            "n_repeats INTEGER, "
+            "params TEXT, "
+            "results TEXT, "
+            "PRIMARY KEY (experiment, n_repeats, params))"
+        )
+        self._connection.commit()
+
+    def get(self, identity, n_repeats, param_tuple):
+        cursor = self._connection.execute(
+            "SELECT results FROM results "
+            "WHERE experiment = ? AND n_repeats = ? AND params = ?",
+            (identity, n_repeats, repr(param_tuple)),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    def set(self, identity, n_repeats, param_tuple, results_list):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (
+                identity,
+                n_repeats,
+                repr(param_tuple),
+                json.dumps([float(result) for result in results_list]),
+            ),
+        )
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
 class ParamSweeper:
     def __init__(
         self,
@@ -75,22 +145,83 @@ class ParamSweeper:
         n_repeats=5,
         n_sigma=1,
         higher_is_better=True,
-        print_every=1,
         verbose=True,
         printer=None,
+        n_workers=None,
+        result_cache=None,
+        checkpoint_filename=None,
+        checkpoint_interval=10.0,
+        progress_interval=1.0,
+        race_sigma=None,
+        race_min_repeats=5,
+        fidelity_eta=None,
+        min_fidelity=None,
+        vectorise=False,
     ):
         self._experiment = experiment
         self._n_repeats = n_repeats
         self._n_sigma = n_sigma
         self._higher_is_better = higher_is_better
-        self._print_every = print_every
         self._verbose = verbose
+        self._n_workers = n_workers
+        self._result_cache = result_cache
+        self._checkpoint_filename = checkpoint_filename
+        self._checkpoint_interval = checkpoint_interval
+        self._last_checkpoint_time = None
+        self._progress_interval = progress_interval
+        self._race_sigma = race_sigma
+        self._race_min_repeats = race_min_repeats
+        self._fidelity_eta = fidelity_eta
+        self._min_fidelity = min_fidelity
+        self._vectorise = vectorise
+        if race_min_repeats < 1:
+            raise ValueError(
+                "race_min_repeats must be at least 1, but received %s"
+                % race_min_repeats
+            )
+        if fidelity_eta is not None:
+            if race_sigma is not None:
+                raise ValueError(
+                    "Racing and multi-fidelity sweeps can't both be enabled"
+                )
+            if experiment.get_fidelity() is None:
+                raise ValueError(
+                    "Multi-fidelity sweeps require an experiment which "
+                    "declares its fidelity using get_fidelity"
+                )
+            if fidelity_eta <= 1:
+                raise ValueError(
+                    "fidelity_eta must be greater than 1, but received %s"
+                    % fidelity_eta
+                )
+            if (min_fidelity is not None) and (min_fidelity <= 0):
+                raise ValueError(
+                    "min_fidelity must be greater than 0, but received %s"
+                    % min_fidelity
+                )
+        if vectorise:
+            if n_workers is not None:
+                raise ValueError(
+                    "Vectorised sweeps can't be distributed over worker "
+                    "processes"
+                )
+            run_batch = getattr(type(experiment), "run_batch", None)
+            if run_batch in [None, Experiment.run_batch]:
+                raise ValueError(
+                    "Vectorised sweeps require an experiment which "
+                    "implements run_batch"
+                )
         if printer is None:
             printer = util.Printer()
         self._print = printer
 
         self._param_list = list()
         self._params_to_results_dict = dict()
+        self._low_fidelity_results_dict = dict()
+        self._seeder = util.Seeder(stateless=True)
+        self._param_ind = 0
+        self._bayesian_ind = 0
+        self._has_updated_any_parameters = False
         self._context = util.ExceptionContext(
             suppress_exceptions=True,
             printer=printer,
@@ -101,35 +232,135 @@ class ParamSweeper:
 
     def find_best_parameters(self):
         while True:
-            self._has_updated_any_parameters = False
-            for parameter in self._param_list:
+            while self._param_ind < len(self._param_list):
+                parameter = self._param_list[self._param_ind]
                 self._print("\nSweeping over parameter %r..." % parameter.name)
                 self.sweep_parameter(parameter, update_parameters=True)
+                self._param_ind += 1
+                self.save_checkpoint()
+
+            self._param_ind = 0
             if not self._has_updated_any_parameters:
                 self._print("\nFinished sweeping through parameters")
                 break
 
+            self._has_updated_any_parameters = False
+
         self._print("Best parameters found:")
         for param in self._param_list:
             self._print("> %20r = %s" % (param.name, param.default))
 
         return {param.name: param.default for param in self._param_list}
 
+    def save_checkpoint(self):
+        if self._checkpoint_filename is None:
+            return
+
+        checkpoint = {
+            "param_state_dict": {
+                param.name: [
+                    param.default,
+                    param.val_range,
+                    param.val_results_dict,
+                ]
+                for param in self._param_list
+            },
+            "params_to_results_dict": self._params_to_results_dict,
+            "low_fidelity_results_dict": self._low_fidelity_results_dict,
+            "param_ind": self._param_ind,
+            "bayesian_ind": self._bayesian_ind,
+            "has_updated_any_parameters": self._has_updated_any_parameters,
+        }
+        dir_name = os.path.dirname(os.path.abspath(self._checkpoint_filename))
+        if not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+
+        tmp_filename = "%s.tmp" % self._checkpoint_filename
+        with open(tmp_filename, "wb") as f:
+            pickle.dump(checkpoint, f)
+        os.replace(tmp_filename, self._checkpoint_filename)
+        self._last_checkpoint_time = time.perf_counter()
+
+    def _save_checkpoint_if_due(self):
+        if (
+            (self._last_checkpoint_time is None)
+            or (
+                time.perf_counter() - self._last_checkpoint_time
+                >= self._checkpoint_interval
+            )
+        ):
+            self.save_checkpoint()
+
+    def load_checkpoint(self, checkpoint_filename=None):
+        if checkpoint_filename is None:
+            checkpoint_filename = self._checkpoint_filename
+
+        self._print("Resuming from checkpoint \"%s\"..." % checkpoint_filename)
+        with open(checkpoint_filename, "rb") as f:
+            checkpoint = pickle.load(f)
+
+        param_state_dict = checkpoint["param_state_dict"]
+        for param in self._param_list:
+            if param.name in param_state_dict:
+                default, val_range, val_results_dict = (
+                    param_state_dict[param.name]
+                )
+                param.default = default
+                param.val_range = val_range
+                param.val_results_dict = val_results_dict
+
+        self._params_to_results_dict.update(
+            checkpoint["params_to_results_dict"]
+        )
+        self._low_fidelity_results_dict.update(
+            checkpoint.get("low_fidelity_results_dict", dict())
+        )
+        self._param_ind = checkpoint["param_ind"]
+        self._bayesian_ind = checkpoint.get("bayesian_ind", 0)
+        self._has_updated_any_parameters = (
+            checkpoint["has_updated_any_parameters"]
+        )
+
     def sweep_parameter(self, parameter, update_parameters=True):
         param_dict = {param.name: param.default for param in self._param_list}
-        val_results_dict = dict()
+        val_param_tuple_dict = dict()
+        new_param_dict_dict = dict()
 
         for val in parameter.val_range:
             param_dict[parameter.name] = val
             param_tuple = tuple(sorted(param_dict.items()))
+            val_param_tuple_dict[val] = param_tuple
 
-            if param_tuple not in self._params_to_results_dict:
-                results_list = self._run_experiment(param_dict)
-                self._params_to_results_dict[param_tuple] = results_list
+            if not self._has_results(param_tuple):
+                new_param_dict_dict[param_tuple] = param_dict.copy()
+
+        if (self._fidelity_eta is None) and (self._race_sigma is None):
+            self._evaluate_param_dicts(list(new_param_dict_dict.values()))
+        else:
+            if self._fidelity_eta is not None:
+                results_list_list = self._run_multi_fidelity(
+                    list(new_param_dict_dict.values())
+                )
             else:
-                results_list = self._params_to_results_dict[param_tuple]
+                results_list_list = self._race_experiments(
+                    list(new_param_dict_dict.values()),
+                    [
+                        self._params_to_results_dict[param_tuple]
+                        for param_tuple in val_param_tuple_dict.values()
+                        if param_tuple not in new_param_dict_dict
+                    ],
+                )
 
-            val_results_dict[val] = results_list
+            for param_tuple, results_list in zip(
+                new_param_dict_dict.keys(),
+                results_list_list,
+            ):
+                self._set_results(param_tuple, results_list)
+
+        val_results_dict = {
+            val: self._params_to_results_dict[param_tuple]
+            for val, param_tuple in val_param_tuple_dict.items()
+        }
 
         if update_parameters:
             best_param_val, score = self._get_best_param_val(val_results_dict)
@@ -148,6 +379,288 @@ class ParamSweeper:
 
         return val_results_dict
 
+    def find_best_parameters_bayesian(
+        self,
+        n_iterations=20,
+        n_initial=5,
+        max_candidates=2000,
+        length_scale_list=None,
+        noise_var=0.05,
+        min_expected_improvement=0,
+    ):
+        if length_scale_list is None:
+            length_scale_list = [0.1, 0.2, 0.5, 1.0]
+
+        rng = self._seeder.get_rng("find_best_parameters_bayesian")
+        candidate_inds = self._get_candidate_inds(max_candidates, rng)
+        features = np.array(
+            [
+                [
+                    i / max(len(param.val_range) - 1, 1)
+                    for i, param in zip(inds, self._param_list)
+                ]
+                for inds in candidate_inds
+            ]
+        )
+        param_tuple_list = [
+            tuple(sorted(self._get_param_dict(inds).items()))
+            for inds in candidate_inds
+        ]
+
+        default_inds = tuple(
+            list(param.val_range).index(param.default)
+            if param.default in list(param.val_range) else 0
+            for param in self._param_list
+        )
+        initial_inds = [default_inds] + [
+            candidate_inds[i]
+            for i in rng.permutation(len(candidate_inds))[:n_initial - 1]
+        ]
+        self._print("\nEvaluating %i initial points..." % len(initial_inds))
+        self._evaluate_param_dicts(
+            [self._get_param_dict(inds) for inds in initial_inds]
+        )
+
+        while self._bayesian_ind < n_iterations:
+            is_observed = np.array(
+                [
+                    param_tuple in self._params_to_results_dict
+                    for param_tuple in param_tuple_list
+                ]
+            )
+            if np.all(is_observed):
+                break
+
+            is_valid = np.array(
+                [
+                    is_observed[j]
+                    and (len(self._params_to_results_dict[param_tuple]) > 0)
+                    for j, param_tuple in enumerate(param_tuple_list)
+                ]
+            )
+            y = np.array(
+                [
+                    self._get_score(self._params_to_results_dict[param_tuple])
+                    for j, param_tuple in enumerate(param_tuple_list)
+                    if is_valid[j]
+                ]
+            )
+            unobserved_inds = np.flatnonzero(~is_observed)
+            if y.size == 0:
+                ei = np.zeros(unobserved_inds.size)
+                next_ind = rng.choice(unobserved_inds)
+            else:
+                mean, std = _fit_gp(
+                    features[is_valid],
+                    y,
+                    features[unobserved_inds],
+                    length_scale_list,
+                    noise_var,
+                )
+                ei = _expected_improvement(mean, std, np.max(y))
+                if np.max(ei) < min_expected_improvement:
+                    self._print(
+                        "\nMaximum expected improvement %.3g is below %.3g, "
+                        "stopping" % (np.max(ei), min_expected_improvement)
+                    )
+                    break
+
+                next_ind = unobserved_inds[np.argmax(ei)]
+            next_param_dict = self._get_param_dict(candidate_inds[next_ind])
+            self._print(
+                "\nBayesian optimisation iteration %i/%i, expected "
+                "improvement = %.3g"
+                % (self._bayesian_ind + 1, n_iterations, np.max(ei))
+            )
+            self._evaluate_param_dicts([next_param_dict])
+            self._bayesian_ind += 1
+            self.save_checkpoint()
+
+        self._bayesian_ind = 0
+
+        best_param_tuple = max(
+            (
+                param_tuple for param_tuple in param_tuple_list
+                if len(self._params_to_results_dict.get(param_tuple, [])) > 0
+            ),
+            key=lambda param_tuple: self._get_score(
+                self._params_to_results_dict[param_tuple]
+            ),
+        )
+        best_param_dict = dict(best_param_tuple)
+        self._set_best_parameters(best_param_dict)
+        return best_param_dict
+
+    def grid_sweep(self, max_batch_rows=10000):
+        param_dict_list = [
+            self._get_param_dict(inds)
+            for inds in itertools.product(
+                *[range(len(param.val_range)) for param in self._param_list]
+            )
+        ]
+        self._print(
+            "\nSweeping over a grid of %i parameter combinations..."
+            % len(param_dict_list)
+        )
+        chunk_size = max(1, max_batch_rows // self._n_repeats)
+        for i in range(0, len(param_dict_list), chunk_size):
+            self._evaluate_param_dicts(param_dict_list[i:i + chunk_size])
+
+        param_tuple_list = [
+            tuple(sorted(param_dict.items()))
+            for param_dict in param_dict_list
+        ]
+        best_param_tuple = max(
+            (
+                param_tuple for param_tuple in param_tuple_list
+                if len(self._params_to_results_dict[param_tuple]) > 0
+            ),
+            key=lambda param_tuple: self._get_score(
+                self._params_to_results_dict[param_tuple]
+            ),
+        )
+        best_param_dict = dict(best_param_tuple)
+        self._set_best_parameters(best_param_dict)
+        return best_param_dict
+
+    def plot_grid(
+        self,
+        experiment_name="Experiment",
+        output_dir=None,
+        **plot_kwargs,
+    ):
+        default_param_dict = {
+            param.name: param.default for param in self._param_list
+        }
+        filename_list = []
+        for param_x, param_y in itertools.combinations(self._param_list, 2):
+            z_shape = [len(param_y.val_range), len(param_x.val_range)]
+            z = np.full(z_shape, np.nan)
+            param_dict = default_param_dict.copy()
+            for i, val_y in enumerate(param_y.val_range):
+                for j, val_x in enumerate(param_x.val_range):
+                    param_dict[param_x.name] = val_x
+                    param_dict[param_y.name] = val_y
+                    param_tuple = tuple(sorted(param_dict.items()))
+                    results_list = self._params_to_results_dict.get(
+                        param_tuple,
+                        [],
+                    )
+                    if len(results_list) > 0:
+                        z[i, j] = self._get_score(results_list)
+
+            if self._higher_is_better:
+                colorbar_label = "Mean - %s std" % self._n_sigma
+            else:
+                z = -z
+                colorbar_label = "Mean + %s std" % self._n_sigma
+
+            plot_filename = plotting.plot(
+                plotting.Heatmap(
+                    z,
+                    x_tick_labels=_get_tick_labels(param_x.val_range),
+                    y_tick_labels=_get_tick_labels(param_y.val_range),
+                    colorbar_label=colorbar_label,
+                ),
+                plot_name=(
+                    "Parameter grid sweep results for %r, varying parameters "
+                    "%r and %r" % (experiment_name, param_x.name, param_y.name)
+                ),
+                dir_name=output_dir,
+                axis_properties=plotting.AxisProperties(
+                    xlabel=param_x.name,
+                    ylabel=param_y.name,
+                    rotate_xticklabels=True,
+                ),
+                **plot_kwargs,
+            )
+            filename_list.append(plot_filename)
+
+        return filename_list
+
+    def _set_best_parameters(self, best_param_dict):
+        for param in self._param_list:
+            param.default = best_param_dict[param.name]
+
+        for param in self._param_list:
+            param_dict = best_param_dict.copy()
+            val_results_dict = dict()
+            for val in param.val_range:
+                param_dict[param.name] = val
+                param_tuple = tuple(sorted(param_dict.items()))
+                val_results_dict[val] = self._params_to_results_dict.get(
+                    param_tuple,
+                    [],
+                )
+            param.val_results_dict = val_results_dict
+
+        self._print("Best parameters found:")
+        for param in self._param_list:
+            self._print("> %20r = %s" % (param.name, param.default))
+
+    def _get_candidate_inds(self, max_candidates, rng):
+        num_vals_list = [len(param.val_range) for param in self._param_list]
+        num_candidates = int(np.prod(num_vals_list))
+        if num_candidates <= max_candidates:
+            return list(itertools.product(*[range(n) for n in num_vals_list]))
+
+        flat_inds = rng.choice(num_candidates, max_candidates, replace=False)
+        return [
+            tuple(int(i) for i in np.unravel_index(flat_ind, num_vals_list))
+            for flat_ind in np.sort(flat_inds)
+        ]
+
+    def _get_param_dict(self, inds):
+        return {
+            param.name: param.val_range[i]
+            for i, param in zip(inds, self._param_list)
+        }
+
+    def _evaluate_param_dicts(self, param_dict_list):
+        new_param_dict_dict = dict()
+        for param_dict in param_dict_list:
+            param_tuple = tuple(sorted(param_dict.items()))
+            if not self._has_results(param_tuple):
+                new_param_dict_dict[param_tuple] = param_dict
+
+        for results_list, param_tuple in zip(
+            self._iter_experiments(list(new_param_dict_dict.values())),
+            new_param_dict_dict.keys(),
+        ):
+            self._set_results(param_tuple, results_list)
+            self._save_checkpoint_if_due()
+
+        if len(new_param_dict_dict) > 0:
+            self.save_checkpoint()
+
+    def _has_results(self, param_tuple):
+        if param_tuple in self._params_to_results_dict:
+            return True
+        if self._result_cache is not None:
+            results_list = self._result_cache.get(
+                self._get_cache_identity(),
+                self._n_repeats,
+                param_tuple,
+            )
+            if results_list is not None:
+                self._params_to_results_dict[param_tuple] = results_list
+                return True
+
+        return False
+
+    def _set_results(self, param_tuple, results_list):
+        self._params_to_results_dict[param_tuple] = results_list
+        if (
+            (self._result_cache is not None)
+            and (len(results_list) == self._n_repeats)
+        ):
+            self._result_cache.set(
+                self._get_cache_identity(),
+                self._n_repeats,
+                param_tuple,
+                results_list,
+            )
+
     def tighten_ranges(self, new_num_vals=15):
         for param in self._param_list:
             if any(not util.is_numeric(v) for v in param.val_range):
@@ -255,48 +768,478 @@ class ParamSweeper:
 
         return filename_list
 
-    def _run_experiment(self, experiment_param_dict):
-        if self._verbose:
-            self._print("Running an experiment with parameters:")
-            for name, value in experiment_param_dict.items():
-                self._print("| %20r = %r" % (name, value))
+    def _run_experiments(
+        self,
+        experiment_param_dict_list,
+        repeat_range=None,
+        pool=None,
+    ):
+        return list(
+            self._iter_experiments(
+                experiment_param_dict_list,
+                repeat_range,
+                pool,
+            )
+        )
+
+    def _iter_experiments(
+        self,
+        experiment_param_dict_list,
+        repeat_range=None,
+        pool=None,
+    ):
+        if repeat_range is None:
+            repeat_range = range(self._n_repeats)
+
+        if self._vectorise:
+            yield from self._run_experiments_vectorised(
+                experiment_param_dict_list,
+                repeat_range,
+            )
+            return
+
+        if (self._n_workers is not None) and (pool is None):
+            with concurrent.futures.ProcessPoolExecutor(
+                self._n_workers
+            ) as pool:
+                yield from self._iter_experiments(
+                    experiment_param_dict_list,
+                    repeat_range,
+                    pool,
+                )
+            return
+
+        progress_reporter = self._get_progress_reporter(
+            len(experiment_param_dict_list) * len(repeat_range)
+        )
+        if self._n_workers is None:
+            for experiment_param_dict in experiment_param_dict_list:
+                yield self._run_experiment(
+                    experiment_param_dict,
+                    repeat_range,
+                    progress_reporter,
+                )
+            return
+
+        future_list_list = []
+        for experiment_param_dict in experiment_param_dict_list:
+            seed_list = self._get_seed_list(experiment_param_dict)
+            future_list = [
+                pool.submit(
+                    _run_repeat,
+                    self._experiment,
+                    experiment_param_dict,
+                    seed_list[i],
+                )
+                for i in repeat_range
+            ]
+            future_list_list.append(future_list)
+
+        for experiment_param_dict, future_list in zip(
+            experiment_param_dict_list,
+            future_list_list,
+        ):
+            yield self._gather_results(
+                experiment_param_dict,
+                future_list,
+                progress_reporter,
+            )
+
+    def _run_experiments_vectorised(
+        self,
+        experiment_param_dict_list,
+        repeat_range,
+    ):
+        if len(experiment_param_dict_list) == 0:
+            return []
+
+        seed_list_list = []
+        for experiment_param_dict in experiment_param_dict_list:
+            self._print_params(experiment_param_dict)
+            seed_list = self._get_seed_list(experiment_param_dict)
+            seed_list_list.append([seed_list[i] for i in repeat_range])
+
+        results_list_list = [[] for _ in experiment_param_dict_list]
+        with self._context:
+            batch_results_list_list = self._experiment.run_batch(
+                experiment_param_dict_list,
+                seed_list_list,
+            )
+            if (
+                (len(batch_results_list_list) != len(seed_list_list))
+                or any(
+                    len(results_list) != len(repeat_range)
+                    for results_list in batch_results_list_list
+                )
+            ):
+                raise ValueError(
+                    "run_batch must return a list of %i results for each of "
+                    "the %i parameter dictionaries"
+                    % (len(repeat_range), len(experiment_param_dict_list))
+                )
+            results_list_list = [
+                list(results_list)
+                for results_list in batch_results_list_list
+            ]
+
+        return results_list_list
+
+    def _race_experiments(
+        self,
+        experiment_param_dict_list,
+        contender_results_list_list,
+        pool=None,
+    ):
+        if len(experiment_param_dict_list) == 0:
+            return []
+
+        if (self._n_workers is not None) and (pool is None):
+            with concurrent.futures.ProcessPoolExecutor(
+                self._n_workers
+            ) as pool:
+                return self._race_experiments(
+                    experiment_param_dict_list,
+                    contender_results_list_list,
+                    pool,
+                )
+
+        results_list_list = [[] for _ in experiment_param_dict_list]
+        active_inds = list(range(len(experiment_param_dict_list)))
+        n_done = 0
+        while (len(active_inds) > 0) and (n_done < self._n_repeats):
+            n_next = min(
+                max(2 * n_done, self._race_min_repeats),
+                self._n_repeats,
+            )
+            new_results_list_list = self._run_experiments(
+                [experiment_param_dict_list[i] for i in active_inds],
+                range(n_done, n_next),
+                pool,
+            )
+            for i, new_results_list in zip(
+                active_inds,
+                new_results_list_list,
+            ):
+                results_list_list[i].extend(new_results_list)
+
+            n_done = n_next
+            if n_done < self._n_repeats:
+                active_inds = self._get_race_survivors(
+                    results_list_list,
+                    active_inds,
+                    contender_results_list_list,
+                )
+
+        num_runs = sum(len(r) for r in results_list_list)
+        num_runs_full = len(results_list_list) * self._n_repeats
+        self._print(
+            "Racing: %i/%i values eliminated early, %i/%i runs performed "
+            "(%i runs saved)"
+            % (
+                len(results_list_list) - len(active_inds),
+                len(results_list_list),
+                num_runs,
+                num_runs_full,
+                num_runs_full - num_runs,
+            )
+        )
+
+        return results_list_list
+
+    def _run_multi_fidelity(self, experiment_param_dict_list):
+        if len(experiment_param_dict_list) == 0:
+            return []
+
+        full_fidelity = self._experiment.get_fidelity()
+        fidelity_list = self._get_fidelity_list(full_fidelity)
+        active_inds = list(range(len(experiment_param_dict_list)))
+        cost = 0
+        try:
+            for fidelity in fidelity_list[:-1]:
+                self._print(
+                    "Multi-fidelity: evaluating %i values with fidelity %s"
+                    % (len(active_inds), fidelity)
+                )
+                self._experiment.set_fidelity(fidelity)
+                results_list_list = self._run_low_fidelity(
+                    [experiment_param_dict_list[i] for i in active_inds],
+                    fidelity,
+                )
+                cost += fidelity * sum(len(r) for r in results_list_list)
+                num_promoted = max(
+                    int(np.ceil(len(active_inds) / self._fidelity_eta)),
+                    1,
+                )
+                score_list = [
+                    self._get_score(results_list)
+                    for results_list in results_list_list
+                ]
+                promoted_order = np.argsort(score_list)[::-1]
+                active_inds = sorted(
+                    active_inds[j] for j in promoted_order[:num_promoted]
+                )
+        finally:
+            self._experiment.set_fidelity(full_fidelity)
+
+        self._print(
+            "Multi-fidelity: evaluating %i values with fidelity %s"
+            % (len(active_inds), full_fidelity)
+        )
+        full_results_list_list = self._run_experiments(
+            [experiment_param_dict_list[i] for i in active_inds]
+        )
+        cost += full_fidelity * sum(len(r) for r in full_results_list_list)
+
+        results_list_list = [[] for _ in experiment_param_dict_list]
+        for i, results_list in zip(active_inds, full_results_list_list):
+            results_list_list[i] = results_list
+
+        full_cost = (
+            full_fidelity * len(experiment_param_dict_list) * self._n_repeats
+        )
+        self._print(
+            "Multi-fidelity: total cost = %.3g%% of evaluating every value "
+            "with full fidelity"
+            % (100 * cost / full_cost)
+        )
+
+        return results_list_list
+
+    def _run_low_fidelity(self, experiment_param_dict_list, fidelity):
+        new_param_dict_dict = dict()
+        for experiment_param_dict in experiment_param_dict_list:
+            param_tuple = tuple(sorted(experiment_param_dict.items()))
+            if (fidelity, param_tuple) not in self._low_fidelity_results_dict:
+                new_param_dict_dict[param_tuple] = experiment_param_dict
+
+        results_list_list = self._run_experiments(
+            list(new_param_dict_dict.values())
+        )
+        for param_tuple, results_list in zip(
+            new_param_dict_dict.keys(),
+            results_list_list,
+        ):
+            self._low_fidelity_results_dict[fidelity, param_tuple] = (
+                results_list
+            )
 
+        return [
+            self._low_fidelity_results_dict[
+                fidelity,
+                tuple(sorted(experiment_param_dict.items())),
+            ]
+            for experiment_param_dict in experiment_param_dict_list
+        ]
+
+    def _get_fidelity_list(self, full_fidelity):
+        if self._min_fidelity is None:
+            min_fidelity = full_fidelity / np.square(self._fidelity_eta)
+        else:
+            min_fidelity = self._min_fidelity
+
+        fidelity_list = [full_fidelity]
+        while True:
+            fidelity = type(full_fidelity)(
+                fidelity_list[-1] / self._fidelity_eta
+            )
+            if (fidelity < min_fidelity) or (fidelity <= 0):
+                break
+            fidelity_list.append(fidelity)
+
+        return fidelity_list[::-1]
+
+    def _get_score(self, results_list):
+        if len(results_list) == 0:
+            return -np.inf
+
+        if self._higher_is_better:
+            results = np.array(results_list)
+        else:
+            results = -np.array(results_list)
+
+        return np.mean(results) - (self._n_sigma * np.std(results))
+
+    def _get_race_survivors(
+        self,
+        results_list_list,
+        active_inds,
+        contender_results_list_list,
+    ):
+        bounds_dict = {
+            i: self._get_race_bounds(results_list_list[i])
+            for i in active_inds
+            if len(results_list_list[i]) > 1
+        }
+        contender_bounds_list = [
+            self._get_race_bounds(results_list)
+            for results_list in contender_results_list_list
+            if len(results_list) > 1
+        ]
+        lower_bound_list = [
+            lower for lower, _ in
+            list(bounds_dict.values()) + contender_bounds_list
+        ]
+        if len(lower_bound_list) == 0:
+            return active_inds
+
+        best_lower_bound = max(lower_bound_list)
+        survivor_inds = [
+            i for i in active_inds
+            if (i not in bounds_dict)
+            or (bounds_dict[i][1] >= best_lower_bound)
+        ]
+        return survivor_inds
+
+    def _get_race_bounds(self, results_list):
+        if self._higher_is_better:
+            results = np.array(results_list)
+        else:
+            results = -np.array(results_list)
+
+        std = np.std(results)
+        score = np.mean(results) - (self._n_sigma * std)
+        score_var = (1 + np.square(self._n_sigma) / 2) / results.size
+        half_width = self._race_sigma * std * np.sqrt(score_var)
+        return score - half_width, score + half_width
+
+    def _run_experiment(
+        self,
+        experiment_param_dict,
+        repeat_range=None,
+        progress_reporter=None,
+    ):
+        if repeat_range is None:
+            repeat_range = range(self._n_repeats)
+
+        self._print_params(experiment_param_dict)
+
+        seed_list = self._get_seed_list(experiment_param_dict)
         results_list = []
-        for i in range(self._n_repeats):
+        for i in repeat_range:
             with self._context:
-                score = self._experiment.run(**experiment_param_dict)
+                score = _run_repeat(
+                    self._experiment,
+                    experiment_param_dict,
+                    seed_list[i],
+                )
                 results_list.append(score)
-                if self._verbose and ((i % self._print_every) == 0):
-                    self._print(
-                        "Repeat %i/%i, result is %s"
-                        % (i, self._n_repeats, score)
-                    )
+            if progress_reporter is not None:
+                progress_reporter.update()
+
+        return results_list
+
+    def _gather_results(
+        self,
+        experiment_param_dict,
+        future_list,
+        progress_reporter=None,
+    ):
+        self._print_params(experiment_param_dict)
+
+        results_list = []
+        for future in future_list:
+            with self._context:
+                score = future.result()
+                results_list.append(score)
+            if progress_reporter is not None:
+                progress_reporter.update()
 
         return results_list
 
+    def _get_progress_reporter(self, num_runs):
+        if (self._progress_interval is None) or (num_runs == 0):
+            return None
+
+        progress_reporter = util.ProgressReporter(
+            num_runs,
+            name="experiments",
+            steps_per_item=self._experiment.get_num_steps(),
+            print_interval=self._progress_interval,
+            printer=self._print,
+        )
+        return progress_reporter
+
+    def _print_params(self, experiment_param_dict):
+        if self._verbose:
+            self._print("Running an experiment with parameters:")
+            for name, value in experiment_param_dict.items():
+                self._print("| %20r = %r" % (name, value))
+
+    def _get_cache_identity(self):
+        identity = self._experiment.get_identity()
+        if self._vectorise:
+            identity += " (vectorised)"
+
+        return identity
+
+    def _get_seed_list(self, experiment_param_dict):
+        param_tuple = tuple(sorted(experiment_param_dict.items()))
+        seed_list = [
+            self._seeder.get_seed(param_tuple, i)
+            for i in range(self._n_repeats)
+        ]
+        return seed_list
+
     def _get_best_param_val(self, val_results_dict):
-        non_empty_results_dict = {
-            val: results_list
-            for val, results_list in val_results_dict.items()
-            if len(results_list) > 0
-        }
-        if self._higher_is_better:
-            score_dict = {
-                val: (np.mean(results) - self._n_sigma * np.std(results))
-                for val, results in non_empty_results_dict.items()
-            }
-            best_param_val = max(
-                non_empty_results_dict.keys(),
-                key=lambda val: score_dict[val],
-            )
-        else:
-            score_dict = {
-                val: (np.mean(results) + self._n_sigma * np.std(results))
-                for val, results in non_empty_results_dict.items()
-            }
-            best_param_val = min(
-                non_empty_results_dict.keys(),
-                key=lambda val: score_dict[val],
-            )
+        best_param_val = max(
+            (
+                val for val, results_list in val_results_dict.items()
+                if len(results_list) > 0
+            ),
+            key=lambda val: self._get_score(val_results_dict[val]),
+        )
+        score = self._get_score(val_results_dict[best_param_val])
+        if not self._higher_is_better:
+            score = -score
+
+        return best_param_val, score
+
+def _get_tick_labels(val_range):
+    return [
+        ("%.3g" % val) if util.is_numeric(val) else str(val)
+        for val in val_range
+    ]
+
+def _fit_gp(x_train, y_train, x_test, length_scale_list, noise_var):
+    y_mean = np.mean(y_train)
+    y_std = max(np.std(y_train), 1e-12)
+    y_normalised = (y_train - y_mean) / y_std
+
+    best_log_likelihood = -np.inf
+    for length_scale in length_scale_list:
+        k_train = _matern_kernel(x_train, x_train, length_scale)
+        k_train[np.diag_indices_from(k_train)] += noise_var
+        eig_vals, eig_vecs = np.linalg.eigh(k_train)
+        y_projected = eig_vecs.T @ y_normalised
+        log_likelihood = -0.5 * (
+            np.sum(np.square(y_projected) / eig_vals)
+            + np.sum(np.log(eig_vals))
+        )
+        if log_likelihood > best_log_likelihood:
+            best_log_likelihood = log_likelihood
+            best_length_scale = length_scale
+            best_eig_vals = eig_vals
+            best_eig_vecs = eig_vecs
+            best_y_projected = y_projected
+
+    k_test = _matern_kernel(x_test, x_train, best_length_scale)
+    k_test_projected = k_test @ best_eig_vecs
+    mean = k_test_projected @ (best_y_projected / best_eig_vals)
+    var = 1 - np.sum(np.square(k_test_projected) / best_eig_vals, axis=1)
+    var = np.maximum(var, 1e-12)
+    return y_mean + y_std * mean, y_std * np.sqrt(var)
+
+def _matern_kernel(x1, x2, length_scale):
+    sq_dist = np.sum(np.square(x1[:, None, :] - x2[None, :, :]), axis=-1)
+    d = np.sqrt(5 * sq_dist) / length_scale
+    return (1 + d + np.square(d) / 3) * np.exp(-d)
+
+def _expected_improvement(mean, std, best_y):
+    z = (mean - best_y) / std
+    cdf = 0.5 * (1 + np.array([math.erf(zi / math.sqrt(2)) for zi in z]))
+    pdf = np.exp(-0.5 * np.square(z)) / math.sqrt(2 * math.pi)
+    return (mean - best_y) * cdf + std * pdf
 
-        return best_param_val, score_dict[best_param_val]
+def _run_repeat(experiment, experiment_param_dict, seed):
+    experiment.set_seed(seed)
+    return experiment.run(**experiment_param_dict)
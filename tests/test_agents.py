@@ -3,6 +3,7 @@ import pytest
 import tests.util
 import util
 import agents
+import environments
 
 OUTPUT_DIR = tests.util.get_output_dir("test_agents")
 
@@ -37,3 +38,195 @@ def test_bandit_agents(bandit_type):
         printer.print("Action %i = %s" % (i, action))
         reward = rng.normal()
         agent.update(action, reward)
+
+batch_bandit_agent_list = [
+    agents.bandits.BatchEpsilonGreedy,
+    agents.bandits.BatchEpsilonGreedyConstantStepSize,
+    agents.bandits.BatchGradientBandit,
+    agents.bandits.BatchBayesianSamplerValuePrior,
+    agents.bandits.BatchBayesianSamplerBroadPrior,
+]
+
+@pytest.mark.parametrize("bandit_type", batch_bandit_agent_list)
+def test_batch_bandit_agents(bandit_type):
+    """
+    Test each type of batch bandit agent, including the get_name,
+    choose_action and update methods, and check that the agent learns to
+    choose actions with higher rewards when rolled out in a batch of bandit
+    environments
+    """
+    printer = util.Printer("%s.txt" % (bandit_type.__name__), OUTPUT_DIR)
+    seed = util.Seeder().get_seed("test_batch_bandit_agents", bandit_type)
+    rng = np.random.default_rng(seed)
+    printer.print("Seed = %i" % seed)
+
+    num_actions = rng.choice(range(5, 15))
+    n_envs = 200
+    printer.print("num_actions = %i, n_envs = %i" % (num_actions, n_envs))
+
+    agent = bandit_type(n_envs, num_actions=num_actions, rng=rng)
+    env = environments.BatchKArmedBandit(n_envs, k=num_actions, rng=rng)
+    printer.print("agent name = %s" % agent.get_name())
+
+    num_steps = 300
+    mean_rewards = np.zeros(num_steps)
+    for i in range(num_steps):
+        actions = agent.choose_action()
+        assert actions.shape == (n_envs, )
+        assert np.all((actions >= 0) & (actions < num_actions))
+        rewards = env.step(actions)
+        agent.update(actions, rewards)
+        mean_rewards[i] = np.mean(rewards)
+
+    printer.print("Mean rewards = %s" % mean_rewards)
+    assert np.mean(mean_rewards[-100:]) > np.mean(mean_rewards[:10])
+
+@pytest.mark.parametrize(
+    "bandit_type, param_name",
+    [
+        [agents.bandits.BatchEpsilonGreedyConstantStepSize, "step_size"],
+        [agents.bandits.BatchGradientBandit, "step_size"],
+    ],
+)
+def test_batch_agent_per_row_step_size(bandit_type, param_name):
+    """
+    Test that batch agents accept a vector of step sizes with a different
+    value for each environment in the batch, and that rows whose step size is
+    zero never change their estimates, whereas other rows do
+    """
+    rng = util.Seeder().get_rng("test_batch_agent_per_row_step_size")
+    n_envs = 6
+    step_size = np.array([0, 0.1, 0, 0.5, 0, 1])
+    agent = bandit_type(n_envs, rng=rng, **{param_name: step_size})
+    env = environments.BatchKArmedBandit(n_envs, rng=rng)
+    for _ in range(20):
+        actions = agent.choose_action()
+        agent.update(actions, env.step(actions))
+
+    if bandit_type is agents.bandits.BatchGradientBandit:
+        estimates = agent._action_preferences
+    else:
+        estimates = agent._value_estimates
+
+    assert np.all(estimates[step_size == 0] == 0)
+    assert np.all(np.any(estimates[step_size > 0] != 0, axis=1))
+
+def test_batch_epsilon_greedy_per_row_epsilon():
+    """
+    Test that agents.bandits.BatchEpsilonGreedy accepts a vector of epsilon
+    values with a different value for each environment in the batch, and
+    that rows with epsilon = 0 always choose the greedy action, whereas rows
+    with epsilon = 1 choose actions uniformly at random
+    """
+    rng = util.Seeder().get_rng("test_batch_epsilon_greedy_per_row_epsilon")
+    n_envs = 100
+    num_actions = 10
+    epsilon = np.tile([0, 1], n_envs // 2)
+    initial_value_estimates = np.zeros(num_actions)
+    initial_value_estimates[3] = 1
+    agent = agents.bandits.BatchEpsilonGreedy(
+        n_envs,
+        epsilon=epsilon,
+        num_actions=num_actions,
+        initial_value_estimates=initial_value_estimates,
+        rng=rng,
+    )
+    actions = np.array([agent.choose_action() for _ in range(50)])
+    assert np.all(actions[:, epsilon == 0] == 3)
+    assert np.mean(actions[:, epsilon == 1] == 3) < 0.3
+
+def test_epsilon_greedy_ties():
+    """
+    Test that greedy actions chosen by agents.bandits.EpsilonGreedy are always
+    chosen from the actions with the highest value estimate, that ties are
+    broken randomly, and that action selection works with a large number of
+    actions
+    """
+    rng = util.Seeder().get_rng("test_epsilon_greedy_ties")
+    num_actions = 10000
+    value_estimates = rng.normal(size=num_actions)
+    optimal_actions = rng.choice(num_actions, size=3, replace=False)
+    value_estimates[optimal_actions] = np.max(value_estimates) + 1
+    agent = agents.bandits.EpsilonGreedy(
+        epsilon=0,
+        num_actions=num_actions,
+        initial_value_estimates=value_estimates,
+        rng=rng,
+    )
+    action_list = [agent.choose_action() for _ in range(100)]
+    assert set(action_list) == set(optimal_actions)
+
+@pytest.mark.parametrize(
+    "bandit_type",
+    [agents.bandits.GradientBandit, agents.bandits.BatchGradientBandit],
+)
+def test_gradient_bandit_large_preferences(bandit_type):
+    """
+    Test that the gradient bandit agents remain numerically stable (all
+    action probabilities remain finite) with a very large step size and large
+    rewards, and with action preferences which are large enough for their
+    exponentials to overflow
+    """
+    rng = util.Seeder().get_rng("test_gradient_bandit_large", bandit_type)
+    if bandit_type is agents.bandits.BatchGradientBandit:
+        agent = bandit_type(5, step_size=1000, rng=rng)
+        env = environments.BatchKArmedBandit(5, rng=rng, mean_reward=100)
+    else:
+        agent = bandit_type(step_size=1000, rng=rng)
+        env = environments.KArmedBandit(rng=rng, mean_reward=100)
+
+    for _ in range(100):
+        action = agent.choose_action()
+        agent.update(action, env.step(action))
+        assert np.all(np.isfinite(agent._p))
+
+    agent._action_preferences[..., 3] = 1e4
+    for _ in range(100):
+        action = agent.choose_action()
+        agent.update(action, env.step(action))
+        assert np.all(np.isfinite(agent._p))
+
+    assert np.allclose(np.sum(agent._p, axis=-1), 1)
+
+@pytest.mark.parametrize(
+    "bandit_type",
+    [
+        agents.bandits.BayesianSamplerValuePrior,
+        agents.bandits.BayesianSamplerBroadPrior,
+        agents.bandits.BatchBayesianSamplerValuePrior,
+        agents.bandits.BatchBayesianSamplerBroadPrior,
+    ],
+)
+def test_bayesian_sampler_incremental_state(bandit_type):
+    """
+    Test that the posterior parameters and prior statistics which the
+    Bayesian sampler agents maintain incrementally agree with the same
+    quantities recomputed from scratch after a rollout
+    """
+    rng = util.Seeder().get_rng("test_bayesian_sampler_state", bandit_type)
+    num_actions = 20
+    if bandit_type.__name__.startswith("Batch"):
+        agent = bandit_type(8, num_actions=num_actions, rng=rng)
+        env = environments.BatchKArmedBandit(8, k=num_actions, rng=rng)
+    else:
+        agent = bandit_type(num_actions=num_actions, rng=rng)
+        env = environments.KArmedBandit(k=num_actions, rng=rng)
+
+    for _ in range(500):
+        action = agent.choose_action()
+        agent.update(action, env.step(action))
+
+    n = agent._num_action_tries
+    assert np.allclose(agent._data_precision, n / agent._likelihood_var)
+    assert np.allclose(
+        agent._data_weighted_mean,
+        n * agent._likelihood_mean / agent._likelihood_var,
+    )
+    assert np.allclose(
+        agent._get_likelihood_mean_mean(),
+        np.mean(agent._likelihood_mean, axis=-1),
+    )
+    assert np.allclose(
+        agent._get_likelihood_mean_var(),
+        np.var(agent._likelihood_mean, axis=-1),
+    )
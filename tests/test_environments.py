@@ -40,3 +40,109 @@ def test_bandit_environment(repeat):
             "action = %i, reward = %.1f, optimal = %s"
             % (action, reward, optimal)
         )
+
+@pytest.mark.parametrize("repeat", range(3))
+def test_batch_bandit_environment(repeat):
+    """
+    Test the environments.BatchKArmedBandit class, including the step and
+    is_optimal_action methods, and check that the reward noise in each task
+    has the same distribution as in environments.KArmedBandit (unit variance
+    around the value of the chosen action)
+    """
+    printer = util.Printer(
+        "%s %i.txt" % ("BatchKArmedBandit", repeat),
+        OUTPUT_DIR,
+    )
+    seed = util.Seeder().get_seed("BatchKArmedBandit", repeat)
+    rng = np.random.default_rng(seed)
+    printer.print("Seed = %i" % seed)
+
+    num_actions = rng.choice(range(5, 25))
+    n_envs = rng.choice(range(50, 100))
+    printer.print("num_actions = %i, n_envs = %i" % (num_actions, n_envs))
+
+    env = environments.BatchKArmedBandit(n_envs, k=num_actions, rng=rng)
+
+    # Check that every task has at least one optimal action
+    optimal_counts = sum(
+        env.is_optimal_action(np.full(n_envs, action))
+        for action in range(num_actions)
+    )
+    assert np.all(optimal_counts >= 1)
+
+    # Test some random choices of actions
+    for i in range(rng.choice(range(10, 20))):
+        actions = rng.choice(num_actions, size=n_envs)
+        rewards = env.step(actions)
+        optimal = env.is_optimal_action(actions)
+        assert rewards.shape == (n_envs, )
+        assert optimal.shape == (n_envs, )
+        assert optimal.dtype == bool
+        printer.print(
+            "mean reward = %.3f, num optimal = %i"
+            % (np.mean(rewards), np.sum(optimal))
+        )
+
+    # Check the reward noise has zero mean and unit variance in every task
+    actions = rng.choice(num_actions, size=n_envs)
+    noise = np.array(
+        [env.step(actions) for _ in range(1000)]
+    ) - env._action_values[np.arange(n_envs), actions]
+    assert abs(np.mean(noise)) < 0.05
+    assert abs(np.std(noise) - 1) < 0.05
+
+@pytest.mark.parametrize("k", [10, 5000])
+def test_bandit_environment_vectorised(k):
+    """
+    Test that the is_optimal_action and regret methods of
+    environments.KArmedBandit accept arrays of actions (for example a whole
+    trajectory of actions), that they agree with each other and with the
+    results for individual actions, and that large bandits can be constructed
+    """
+    rng = util.Seeder().get_rng("test_bandit_environment_vectorised", k)
+    env = environments.KArmedBandit(k=k, rng=rng)
+    actions = rng.choice(k, size=1000)
+    actions[0] = np.argmax(env._action_values)
+
+    optimal = env.is_optimal_action(actions)
+    regret = env.regret(actions)
+    assert optimal.shape == actions.shape
+    assert regret.shape == actions.shape
+    assert optimal[0]
+    assert np.all(regret >= 0)
+    assert np.all(optimal == (regret == 0))
+    for i in range(10):
+        assert env.is_optimal_action(actions[i]) == optimal[i]
+        assert env.regret(actions[i]) == regret[i]
+
+    batch_env = environments.BatchKArmedBandit(20, k=k, rng=rng)
+    actions = rng.choice(k, size=20)
+    regret = batch_env.regret(actions)
+    assert regret.shape == (20, )
+    assert np.all(batch_env.is_optimal_action(actions) == (regret == 0))
+
+def test_bandit_environment_noise_buffer():
+    """
+    Test environments.KArmedBandit with pre-generated reward noise buffers,
+    that two environments seeded identically produce identical rewards (also
+    after the noise buffer has been refilled), and that the reward noise has
+    zero mean and unit variance
+    """
+    seed = util.Seeder().get_seed("test_bandit_environment_noise_buffer")
+    env_list = [
+        environments.KArmedBandit(
+            rng=np.random.default_rng(seed),
+            noise_buffer_size=100,
+        )
+        for _ in range(2)
+    ]
+    actions = np.random.default_rng(seed).choice(10, size=5000)
+    reward_array_list = [
+        np.array([env.step(action) for action in actions])
+        for env in env_list
+    ]
+    assert np.all(reward_array_list[0] == reward_array_list[1])
+
+    noise = reward_array_list[0] - env_list[0]._action_values[actions]
+    assert abs(np.mean(noise)) < 0.05
+    assert abs(np.std(noise) - 1) < 0.05
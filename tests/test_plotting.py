@@ -208,3 +208,29 @@ def test_title():
         legend_properties=plotting.LegendProperties()
     )
     assert os.path.isfile(output_filename)
+
+def test_heatmap():
+    """
+    Test plotting a 2D array of values as a heatmap with a colour bar using
+    the plotting.Heatmap class, including labels for each row and column, and
+    cells with missing (NaN) values, which should be left blank
+    """
+    rng = util.Seeder().get_rng("test_heatmap")
+    z = rng.normal(size=[4, 6])
+    z[1, 2] = np.nan
+    output_filename = plotting.plot(
+        plotting.Heatmap(
+            z,
+            x_tick_labels=["%.3g" % x for x in np.linspace(0, 1, 6)],
+            y_tick_labels=["a", "b", "c", "d"],
+            colorbar_label="z",
+        ),
+        plot_name="test_heatmap",
+        dir_name=OUTPUT_DIR,
+        axis_properties=plotting.AxisProperties(
+            xlabel="x",
+            ylabel="y",
+            rotate_xticklabels=True,
+        ),
+    )
+    assert os.path.isfile(output_filename)
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+import tests.util
+import util
+import agents
+import environments
+import rollout
+
+OUTPUT_DIR = tests.util.get_output_dir("test_rollout")
+
+def test_rollout_scalar():
+    """
+    Test the rollout.run function with a scalar agent and environment, check
+    the shapes of the returned arrays, and that the returned arrays are the
+    same arrays as those provided as arguments when output arrays are provided
+    """
+    printer = util.Printer("test_rollout_scalar.txt", OUTPUT_DIR)
+    rng = util.Seeder().get_rng("test_rollout_scalar")
+    num_steps = 50
+    env = environments.KArmedBandit(rng=rng)
+    agent = agents.bandits.EpsilonGreedy(rng=rng)
+    reward_array, optimal_choice_array = rollout.run(agent, env, num_steps)
+    printer("Rewards = %s" % reward_array)
+    assert reward_array.shape == (num_steps, )
+    assert optimal_choice_array.shape == (num_steps, )
+    assert optimal_choice_array.dtype == bool
+    assert set(np.unique(optimal_choice_array)) <= {0, 1}
+
+    reward_out = np.zeros([3, num_steps], np.float32)
+    optimal_out = np.zeros([3, num_steps], bool)
+    agent = agents.bandits.EpsilonGreedy(rng=rng)
+    reward_array, optimal_choice_array = rollout.run(
+        agent,
+        env,
+        num_steps,
+        reward_out[1],
+        optimal_out[1],
+    )
+    assert np.all(reward_out[1] == reward_array)
+    assert reward_array.dtype == np.float32
+    assert np.all(reward_out[[0, 2]] == 0)
+
+@pytest.mark.parametrize("n_envs", [1, 20])
+def test_rollout_batch(n_envs):
+    """
+    Test the rollout.run function with a batched agent and environment, and
+    check the shapes and contents of the returned arrays
+    """
+    printer = util.Printer("test_rollout_batch %i.txt" % n_envs, OUTPUT_DIR)
+    rng = util.Seeder().get_rng("test_rollout_batch", n_envs)
+    num_steps = 100
+    env = environments.BatchKArmedBandit(n_envs, rng=rng)
+    agent = agents.bandits.BatchGradientBandit(n_envs, rng=rng)
+    reward_array, optimal_choice_array = rollout.run(agent, env, num_steps)
+    printer("Mean rewards = %s" % np.mean(reward_array, axis=0))
+    assert reward_array.shape == (n_envs, num_steps)
+    assert optimal_choice_array.shape == (n_envs, num_steps)
+    assert set(np.unique(optimal_choice_array)) <= {0, 1}
+    assert np.all(np.isfinite(reward_array))
+
+@pytest.mark.parametrize("batch", [True, False])
+def test_rollout_phase_timer(batch):
+    """
+    Test that providing a PhaseTimer to the rollout.run function records the
+    number of calls to each phase of the rollout, and doesn't change the
+    results of the rollout
+    """
+    printer = util.Printer(
+        "test_rollout_phase_timer batch=%s.txt" % batch,
+        OUTPUT_DIR,
+    )
+    num_steps = 30
+    results_list = []
+    for phase_timer in [None, util.PhaseTimer()]:
+        rng = util.Seeder().get_rng("test_rollout_phase_timer", batch)
+        if batch:
+            env = environments.BatchKArmedBandit(5, rng=rng)
+            agent = agents.bandits.BatchEpsilonGreedy(5, rng=rng)
+        else:
+            env = environments.KArmedBandit(rng=rng)
+            agent = agents.bandits.EpsilonGreedy(rng=rng)
+        results = rollout.run(agent, env, num_steps, phase_timer=phase_timer)
+        results_list.append(results)
+
+    phase_timer.print_summary(printer)
+    for phase_name in ["choose_action", "step", "update", "record"]:
+        assert phase_timer.get_num_calls(phase_name) == num_steps
+        assert phase_timer.get_total_time(phase_name) > 0
+
+    (r1, o1), (r2, o2) = results_list
+    assert np.all(r1 == r2)
+    assert np.all(o1 == o2)
+
+@pytest.mark.parametrize(
+    "bandit_type",
+    [
+        agents.bandits.BatchEpsilonGreedy,
+        agents.bandits.BatchEpsilonGreedyConstantStepSize,
+        agents.bandits.BatchGradientBandit,
+        agents.bandits.BatchBayesianSamplerValuePrior,
+        agents.bandits.BatchBayesianSamplerBroadPrior,
+    ],
+)
+def test_rollout_batch_generator(bandit_type):
+    """
+    Test that batched rollouts whose agent and environment draw random numbers
+    from a util.BatchGenerator give the same results for each row regardless
+    of how the rows are split into batches, including over more time steps
+    than the size of each block of random numbers
+    """
+    seeder = util.Seeder(stateless=True)
+    n_envs = 6
+    num_steps = 250
+    reward_array_list = []
+    for batch_list in [[range(n_envs)], [range(2), range(2, n_envs)]]:
+        reward_array_batches = []
+        for batch in batch_list:
+            env_rng = util.BatchGenerator(
+                [seeder.get_seed("env", i) for i in batch]
+            )
+            agent_rng = util.BatchGenerator(
+                [seeder.get_seed("agent", i) for i in batch]
+            )
+            env = environments.BatchKArmedBandit(len(batch), rng=env_rng)
+            agent = bandit_type(len(batch), rng=agent_rng)
+            reward_array, _ = rollout.run(agent, env, num_steps)
+            reward_array_batches.append(reward_array)
+
+        reward_array_list.append(np.concatenate(reward_array_batches))
+
+    r1, r2 = reward_array_list
+    assert r1.shape == (n_envs, num_steps)
+    assert np.all(r1 == r2)
+
+    with pytest.raises(ValueError):
+        env_rng.random(n_envs + 1)
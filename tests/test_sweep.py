@@ -38,7 +38,6 @@ def test_sweep(higher_is_better):
         n_repeats=100,
         n_sigma=2.5,
         higher_is_better=higher_is_better,
-        print_every=50,
         printer=printer,
     )
     sweeper.add_parameter(sweep.Parameter("x", 0, list(range(11))))
@@ -86,7 +85,6 @@ def test_sweep_errors():
         n_repeats=num_repeats,
         n_sigma=2.5,
         higher_is_better=True,
-        print_every=10,
         printer=printer,
     )
     sweeper.add_parameter(sweep.Parameter("x", 0, list(range(11))))
@@ -163,7 +161,6 @@ def test_sweep_categorical_and_log_range_parameters():
         n_repeats=100,
         n_sigma=2.5,
         higher_is_better=True,
-        print_every=50,
         printer=printer,
     )
     y_range = sweep.get_range(0.1, 10, 20, log_space=True)
@@ -286,7 +283,6 @@ def test_default_optimum_not_in_range():
         n_repeats=100,
         n_sigma=2.5,
         higher_is_better=False,
-        print_every=50,
         printer=printer,
     )
     sweeper.add_parameter(sweep.Parameter("x", 0, [-1, 1]))
@@ -300,5 +296,687 @@ def test_default_optimum_not_in_range():
         % len(sweeper._params_to_results_dict)
     )
 
+class SeededExperiment(sweep.Experiment):
+    def set_seed(self, seed):
+        self._rng = np.random.default_rng(seed)
+
+    def run(self, x, y):
+        if x == y:
+            raise ValueError("x and y must be different")
+
+        return - sq_distance([x, y], [1, 3]) + self._rng.normal()
+
+@pytest.mark.parametrize("n_workers", [1, 3])
+def test_sweep_parallel(n_workers):
+    """
+    Test sweeping over parameters with the repeats of each experiment
+    distributed over a pool of worker processes, that the results are
+    identical to those of the same sweep performed serially (regardless of the
+    number of workers), and that exceptions raised in worker processes are
+    suppressed, leaving no results for invalid combinations of parameters
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_sweep_parallel")
+    printer = util.Printer("Console_output %i.txt" % n_workers, output_dir)
+    results_dict_list = []
+    for sweep_n_workers in [None, n_workers]:
+        sweeper = sweep.ParamSweeper(
+            experiment=SeededExperiment(),
+            n_repeats=10,
+            printer=printer,
+            n_workers=sweep_n_workers,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, list(range(5))))
+        sweeper.add_parameter(sweep.Parameter("y", 0, list(range(5))))
+        optimal_param_dict = sweeper.find_best_parameters()
+        assert optimal_param_dict == {"x": 1, "y": 3}
+        results_dict_list.append(sweeper._params_to_results_dict)
+
+    serial_results_dict, parallel_results_dict = results_dict_list
+    assert serial_results_dict == parallel_results_dict
+    for param_tuple, results_list in parallel_results_dict.items():
+        x, y = [pair[1] for pair in param_tuple]
+        if x == y:
+            assert len(results_list) == 0
+        else:
+            assert len(results_list) == 10
+
+def test_result_cache():
+    """
+    Test sharing a persistent sweep.ResultCache between different instances
+    of ParamSweeper, that repeated sweeps load all results from the cache
+    without running any new experiments, that extending the range of a
+    parameter only runs experiments for the new values, that results are not
+    shared between experiments with different identities, and that values
+    whose experiments failed are not cached, so that they are run again by
+    later sweeps
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_result_cache")
+    printer = util.Printer("Console_output.txt", output_dir)
+    cache_filename = os.path.join(output_dir, "cache.sqlite")
+    if os.path.isfile(cache_filename):
+        os.remove(cache_filename)
+
+    class CountingExperiment(sweep.Experiment):
+        def __init__(self, offset=0):
+            self.num_runs = 0
+            self._offset = offset
+
+        def set_seed(self, seed):
+            self._rng = np.random.default_rng(seed)
+
+        def run(self, x):
+            self.num_runs += 1
+            return self._offset - sq_distance(x, 3) + self._rng.normal()
+
+        def get_identity(self):
+            return "CountingExperiment(offset=%s)" % self._offset
+
+    def run_sweep(experiment, x_range):
+        result_cache = sweep.ResultCache(cache_filename)
+        sweeper = sweep.ParamSweeper(
+            experiment,
+            n_repeats=5,
+            printer=printer,
+            result_cache=result_cache,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, x_range))
+        optimal_param_dict = sweeper.find_best_parameters()
+        result_cache.close()
+        return sweeper._params_to_results_dict, optimal_param_dict
+
+    experiment = CountingExperiment()
+    results_dict_1, optimal_param_dict = run_sweep(experiment, list(range(6)))
+    assert experiment.num_runs == 6 * 5
+    assert optimal_param_dict["x"] == 3
+
+    experiment = CountingExperiment()
+    results_dict_2, optimal_param_dict = run_sweep(experiment, list(range(6)))
+    assert experiment.num_runs == 0
+    assert optimal_param_dict["x"] == 3
+    for param_tuple, results_list in results_dict_1.items():
+        assert np.allclose(results_dict_2[param_tuple], results_list)
+
+    experiment = CountingExperiment()
+    run_sweep(experiment, list(range(8)))
+    assert experiment.num_runs == 2 * 5
+
+    experiment = CountingExperiment(offset=1)
+    run_sweep(experiment, list(range(6)))
+    assert experiment.num_runs == 6 * 5
+
+    class FailingExperiment(CountingExperiment):
+        def run(self, x):
+            if (x == 3) and self._fail:
+                raise ValueError("Transient failure")
+
+            return super().run(x)
+
+        def get_identity(self):
+            return "FailingExperiment"
+
+    experiment = FailingExperiment()
+    experiment._fail = True
+    results_dict, _ = run_sweep(experiment, list(range(6)))
+    assert results_dict[(("x", 3), )] == []
+    experiment._fail = False
+    experiment.num_runs = 0
+    results_dict, optimal_param_dict = run_sweep(experiment, list(range(6)))
+    assert experiment.num_runs == 5
+    assert len(results_dict[(("x", 3), )]) == 5
+    assert optimal_param_dict["x"] == 3
+
+def test_checkpoint_resume():
+    """
+    Test interrupting find_best_parameters part of the way through a sweep
+    which saves checkpoints, resuming the sweep from the last checkpoint with
+    a new instance of ParamSweeper, and that the resumed sweep finds the same
+    optimal parameters as an uninterrupted sweep, without repeating any of the
+    experiments performed before the last checkpoint
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_checkpoint_resume")
+    checkpoint_filename = os.path.join(output_dir, "checkpoint.pkl")
+    printer = util.Printer("Console_output.txt", output_dir)
+
+    class Preempted(Exception):
+        pass
+
+    class PreemptingPrinter:
+        def __init__(self, num_sweeps):
+            self._num_sweeps = num_sweeps
+
+        def __call__(self, *args):
+            printer(*args)
+            if "Sweeping over parameter" in args[0]:
+                self._num_sweeps -= 1
+                if self._num_sweeps < 0:
+                    raise Preempted()
+
+    class CountingExperiment(SeededExperiment):
+        num_runs = 0
+
+        def run(self, x, y):
+            CountingExperiment.num_runs += 1
+            return - sq_distance([x, y], [4, 1]) + self._rng.normal()
+
+    def get_sweeper(printer):
+        sweeper = sweep.ParamSweeper(
+            experiment=CountingExperiment(),
+            n_repeats=10,
+            printer=printer,
+            checkpoint_filename=checkpoint_filename,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, list(range(6))))
+        sweeper.add_parameter(sweep.Parameter("y", 0, list(range(6))))
+        return sweeper
+
+    optimal_param_dict = get_sweeper(printer).find_best_parameters()
+    num_runs_uninterrupted = CountingExperiment.num_runs
+    assert optimal_param_dict == {"x": 4, "y": 1}
+
+    CountingExperiment.num_runs = 0
+    with pytest.raises(Preempted):
+        get_sweeper(PreemptingPrinter(num_sweeps=2)).find_best_parameters()
+
+    num_runs_interrupted = CountingExperiment.num_runs
+    assert num_runs_interrupted < num_runs_uninterrupted
+
+    CountingExperiment.num_runs = 0
+    sweeper = get_sweeper(printer)
+    sweeper.load_checkpoint()
+    assert sweeper.find_best_parameters() == optimal_param_dict
+    assert (
+        num_runs_interrupted + CountingExperiment.num_runs
+        == num_runs_uninterrupted
+    )
+
+@pytest.mark.parametrize("search", ["sweep", "grid", "bayesian"])
+def test_checkpoint_resume_mid_search(search):
+    """
+    Test that sweeps over a single parameter, grid sweeps and Bayesian
+    optimisation save a checkpoint after each new value is evaluated, so that
+    a search which is interrupted part of the way through can be resumed from
+    the last checkpoint without repeating any experiments, and finds the same
+    optimal parameters as an uninterrupted search
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_checkpoint_resume_mid_search")
+    checkpoint_filename = os.path.join(output_dir, "%s.pkl" % search)
+    if os.path.isfile(checkpoint_filename):
+        os.remove(checkpoint_filename)
+    printer = util.Printer("Console_output %s.txt" % search, output_dir)
+
+    class Preempted(Exception):
+        pass
+
+    class PreemptingPrinter:
+        def __init__(self, num_experiments):
+            self._num_experiments = num_experiments
+
+        def __call__(self, *args):
+            printer(*args)
+            if "Running an experiment" in args[0]:
+                self._num_experiments -= 1
+                if self._num_experiments < 0:
+                    raise Preempted()
+
+    class CountingExperiment(SeededExperiment):
+        num_runs = 0
+
+        def run(self, x, y):
+            CountingExperiment.num_runs += 1
+            return - sq_distance([x, y], [2, 1]) + self._rng.normal()
+
+    def search_parameters(printer, checkpoint_filename=None, resume=False):
+        sweeper = sweep.ParamSweeper(
+            experiment=CountingExperiment(),
+            n_repeats=3,
+            printer=printer,
+            checkpoint_filename=checkpoint_filename,
+            checkpoint_interval=0,
+        )
+        if search == "sweep":
+            sweeper.add_parameter(sweep.Parameter("x", 0, list(range(12))))
+            sweeper.add_parameter(sweep.Parameter("y", 1, [1]))
+        else:
+            sweeper.add_parameter(sweep.Parameter("x", 0, list(range(5))))
+            sweeper.add_parameter(sweep.Parameter("y", 0, list(range(4))))
+        if resume:
+            sweeper.load_checkpoint()
+        if search == "sweep":
+            return sweeper.find_best_parameters()
+        elif search == "grid":
+            return sweeper.grid_sweep()
+        else:
+            return sweeper.find_best_parameters_bayesian(
+                n_iterations=8,
+                n_initial=3,
+            )
+
+    optimal_param_dict = search_parameters(printer)
+    num_runs_uninterrupted = CountingExperiment.num_runs
+
+    CountingExperiment.num_runs = 0
+    with pytest.raises(Preempted):
+        search_parameters(PreemptingPrinter(7), checkpoint_filename)
+
+    num_runs_interrupted = CountingExperiment.num_runs
+    assert num_runs_interrupted == 7 * 3
+
+    CountingExperiment.num_runs = 0
+    resumed_param_dict = search_parameters(
+        printer,
+        checkpoint_filename,
+        resume=True,
+    )
+    assert resumed_param_dict == optimal_param_dict
+    assert (
+        num_runs_interrupted + CountingExperiment.num_runs
+        == num_runs_uninterrupted
+    )
+
+@pytest.mark.parametrize("n_workers", [None, 2])
+def test_sweep_racing(n_workers):
+    """
+    Test sweeping over parameters in racing mode, that the same optimal
+    parameters are found as in a full sweep while performing fewer runs, that
+    the results of values which are eliminated early are a prefix of their
+    results in the full sweep, that only values which are not eliminated are
+    stored in the result cache, and that a ValueError is raised if
+    race_min_repeats is less than 1
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_sweep_racing")
+    printer = util.Printer("Console_output %s.txt" % n_workers, output_dir)
+    cache_filename = os.path.join(output_dir, "cache %s.sqlite" % n_workers)
+    if os.path.isfile(cache_filename):
+        os.remove(cache_filename)
+
+    n_repeats = 20
+    results_dict_list = []
+    for race_sigma in [None, 2]:
+        result_cache = sweep.ResultCache(cache_filename)
+        sweeper = sweep.ParamSweeper(
+            experiment=SeededExperiment(),
+            n_repeats=n_repeats,
+            printer=printer,
+            n_workers=n_workers,
+            race_sigma=race_sigma,
+            result_cache=result_cache if race_sigma is not None else None,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, list(range(-5, 6))))
+        sweeper.add_parameter(sweep.Parameter("y", 0, list(range(-5, 6))))
+        optimal_param_dict = sweeper.find_best_parameters()
+        assert optimal_param_dict == {"x": 1, "y": 3}
+        results_dict_list.append(sweeper._params_to_results_dict)
+
+    full_results_dict, race_results_dict = results_dict_list
+    num_runs_full = sum(len(r) for r in full_results_dict.values())
+    num_runs_race = sum(len(r) for r in race_results_dict.values())
+    printer(
+        "Full sweep: %i runs, racing: %i runs"
+        % (num_runs_full, num_runs_race)
+    )
+    assert num_runs_race < num_runs_full / 2
+
+    for param_tuple, results_list in race_results_dict.items():
+        full_results_list = full_results_dict[param_tuple]
+        assert results_list == full_results_list[:len(results_list)]
+        cached_results_list = result_cache.get(
+            SeededExperiment().get_identity(),
+            n_repeats,
+            param_tuple,
+        )
+        if len(results_list) < n_repeats:
+            assert cached_results_list is None
+        else:
+            assert cached_results_list == results_list
+
+    result_cache.close()
+
+    with pytest.raises(ValueError):
+        sweep.ParamSweeper(
+            experiment=SeededExperiment(),
+            printer=printer,
+            race_sigma=2,
+            race_min_repeats=0,
+        )
+
+def test_sweep_multi_fidelity():
+    """
+    Test multi-fidelity sweeps, in which new values are first evaluated with
+    low fidelity and only the best values are promoted to higher fidelities,
+    that the optimal parameters are found at a fraction of the cost of a full
+    sweep, that values which aren't promoted have no full-fidelity results,
+    that the fidelity of the experiment is restored after each sweep, and
+    that a ValueError is raised for invalid configurations
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_sweep_multi_fidelity")
+    printer = util.Printer("Console_output.txt", output_dir)
+
+    class FidelityExperiment(SeededExperiment):
+        def __init__(self, fidelity=64):
+            self.fidelity = fidelity
+            self.cost = 0
+
+        def get_fidelity(self):
+            return self.fidelity
+
+        def set_fidelity(self, fidelity):
+            self.fidelity = fidelity
+
+        def run(self, x, y):
+            self.cost += self.fidelity
+            noise = self._rng.normal() * 2 / np.sqrt(self.fidelity)
+            return - sq_distance([x, y], [1, 3]) + noise
+
+    cost_list = []
+    for fidelity_eta in [None, 4]:
+        experiment = FidelityExperiment()
+        sweeper = sweep.ParamSweeper(
+            experiment=experiment,
+            n_repeats=5,
+            printer=printer,
+            fidelity_eta=fidelity_eta,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, list(range(-5, 6))))
+        sweeper.add_parameter(sweep.Parameter("y", 0, list(range(-5, 6))))
+        optimal_param_dict = sweeper.find_best_parameters()
+        assert optimal_param_dict == {"x": 1, "y": 3}
+        assert experiment.fidelity == 64
+        cost_list.append(experiment.cost)
+
+    printer("Full cost = %i, multi-fidelity cost = %i" % tuple(cost_list))
+    assert cost_list[1] < cost_list[0] / 2
+    assert len(sweeper._low_fidelity_results_dict) > 0
+    assert set(f for f, _ in sweeper._low_fidelity_results_dict) == {4, 16}
+    assert any(
+        len(results_list) == 0
+        for results_list in sweeper._params_to_results_dict.values()
+    )
+
+    with pytest.raises(ValueError):
+        sweep.ParamSweeper(FidelityExperiment(), fidelity_eta=4, race_sigma=2)
+    with pytest.raises(ValueError):
+        sweep.ParamSweeper(SeededExperiment(), fidelity_eta=4)
+    for fidelity_eta in [1, 0.5, 0]:
+        with pytest.raises(ValueError):
+            sweep.ParamSweeper(FidelityExperiment(), fidelity_eta=fidelity_eta)
+    for min_fidelity in [0, -1]:
+        with pytest.raises(ValueError):
+            sweep.ParamSweeper(
+                FidelityExperiment(),
+                fidelity_eta=4,
+                min_fidelity=min_fidelity,
+            )
+
+@pytest.mark.parametrize("higher_is_better", [True, False])
+def test_find_best_parameters_bayesian(higher_is_better):
+    """
+    Test the find_best_parameters_bayesian method, that it finds the same
+    optimal parameters as the coordinate-wise find_best_parameters method
+    using fewer runs of the experiment, and that the defaults of the
+    parameters are updated to the optimal parameters
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_find_best_parameters_bayesian")
+    printer = util.Printer(
+        "Console_output higher_is_better=%s.txt" % higher_is_better,
+        output_dir,
+    )
+    sign = 1 if higher_is_better else -1
+
+    class CountingExperiment(SeededExperiment):
+        def __init__(self):
+            self.num_runs = 0
+
+        def run(self, x, y):
+            self.num_runs += 1
+            score = - sq_distance([x, y], [1, 3]) + 0.1 * self._rng.normal()
+            return sign * score
+
+    num_runs_list = []
+    for use_bayesian in [False, True]:
+        experiment = CountingExperiment()
+        sweeper = sweep.ParamSweeper(
+            experiment=experiment,
+            n_repeats=3,
+            higher_is_better=higher_is_better,
+            printer=printer,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", -5, list(range(-5, 6))))
+        sweeper.add_parameter(sweep.Parameter("y", -5, list(range(-5, 6))))
+        if use_bayesian:
+            optimal_param_dict = sweeper.find_best_parameters_bayesian(
+                n_iterations=20,
+            )
+        else:
+            optimal_param_dict = sweeper.find_best_parameters()
+
+        assert optimal_param_dict == {"x": 1, "y": 3}
+        num_runs_list.append(experiment.num_runs)
+
+    printer(
+        "Coordinate-wise: %i runs, Bayesian optimisation: %i runs"
+        % tuple(num_runs_list)
+    )
+    assert num_runs_list[1] < num_runs_list[0]
+    assert [p.default for p in sweeper._param_list] == [1, 3]
+    sweeper.plot(
+        "test_find_best_parameters_bayesian higher_is_better=%s"
+        % higher_is_better,
+        output_dir,
+    )
+
+@pytest.mark.parametrize("race_sigma", [None, 2])
+def test_sweep_vectorised(race_sigma):
+    """
+    Test sweeping over parameters in vectorised mode, in which the
+    experiment's run_batch method receives every new value of a parameter at
+    once, that the optimal parameters are found, that each value receives the
+    correct number of results, that the results of each value depend only on
+    its own seeds (and not on which other values share its batch), and that
+    run_batch is called once per parameter sweep (or once per round when
+    racing)
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_sweep_vectorised")
+    printer = util.Printer("Console_output %s.txt" % race_sigma, output_dir)
+
+    class BatchExperiment(SeededExperiment):
+        def __init__(self):
+            self.num_batches = 0
+
+        def run_batch(self, param_dict_list, seed_list_list):
+            self.num_batches += 1
+            xy = np.array([[d["x"], d["y"]] for d in param_dict_list])
+            sq_dist = np.sum(np.square(xy - [1, 3]), axis=1, keepdims=True)
+            noise = [
+                [np.random.default_rng(seed).normal() for seed in seed_list]
+                for seed_list in seed_list_list
+            ]
+            return (noise - sq_dist).tolist()
+
+    experiment = BatchExperiment()
+    n_repeats = 10
+    sweeper = sweep.ParamSweeper(
+        experiment=experiment,
+        n_repeats=n_repeats,
+        printer=printer,
+        race_sigma=race_sigma,
+        vectorise=True,
+    )
+    sweeper.add_parameter(sweep.Parameter("x", 0, list(range(-5, 6))))
+    sweeper.add_parameter(sweep.Parameter("y", 0, list(range(-5, 6))))
+    optimal_param_dict = sweeper.find_best_parameters()
+    assert optimal_param_dict == {"x": 1, "y": 3}
+
+    for param_tuple, results_list in sweeper._params_to_results_dict.items():
+        if race_sigma is None:
+            assert len(results_list) == n_repeats
+        else:
+            assert 0 < len(results_list) <= n_repeats
+
+        param_dict = dict(param_tuple)
+        seed_list = sweeper._get_seed_list(param_dict)
+        expected_results_list = [
+            - sq_distance([param_dict["x"], param_dict["y"]], [1, 3])
+            + np.random.default_rng(seed).normal()
+            for seed in seed_list[:len(results_list)]
+        ]
+        assert np.allclose(results_list, expected_results_list)
+
+    printer(
+        "%i batches for %i values"
+        % (experiment.num_batches, len(sweeper._params_to_results_dict))
+    )
+    assert experiment.num_batches < len(sweeper._params_to_results_dict) / 3
+
+def test_sweep_vectorised_errors():
+    """
+    Test that vectorised sweeps can't be created for experiments which don't
+    implement run_batch or combined with worker processes, and that values
+    are not cached when run_batch raises an exception or returns the wrong
+    number of results, so that they are run again by later sweeps
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_sweep_vectorised_errors")
+    printer = util.Printer("Console_output.txt", output_dir)
+    cache_filename = os.path.join(output_dir, "cache.sqlite")
+    if os.path.isfile(cache_filename):
+        os.remove(cache_filename)
+
+    with pytest.raises(ValueError):
+        sweep.ParamSweeper(SeededExperiment(), vectorise=True)
+
+    class BatchExperiment(SeededExperiment):
+        def __init__(self, num_missing_values=0):
+            self.num_batches = 0
+            self._num_missing_values = num_missing_values
+
+        def run_batch(self, param_dict_list, seed_list_list):
+            self.num_batches += 1
+            if self._num_missing_values is None:
+                raise ValueError("Transient failure")
+
+            num_values = len(param_dict_list) - self._num_missing_values
+            return [
+                [d["x"] + seed % 3 for seed in seed_list]
+                for d, seed_list in zip(param_dict_list, seed_list_list)
+            ][:num_values]
+
+        def get_identity(self):
+            return "BatchExperiment"
+
+    with pytest.raises(ValueError):
+        sweep.ParamSweeper(BatchExperiment(), n_workers=2, vectorise=True)
+
+    x_range = list(range(5))
+    for num_missing_values, num_batches in [[None, 1], [1, 1], [0, 1], [0, 0]]:
+        experiment = BatchExperiment(num_missing_values)
+        result_cache = sweep.ResultCache(cache_filename)
+        sweeper = sweep.ParamSweeper(
+            experiment,
+            printer=printer,
+            result_cache=result_cache,
+            vectorise=True,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, x_range))
+        sweeper._evaluate_param_dicts([{"x": x} for x in x_range])
+        result_cache.close()
+        assert experiment.num_batches == num_batches
+        for results_list in sweeper._params_to_results_dict.values():
+            if num_missing_values == 0:
+                assert len(results_list) == 5
+            else:
+                assert results_list == []
+
+@pytest.mark.parametrize("vectorise", [False, True])
+def test_grid_sweep(vectorise):
+    """
+    Test evaluating every combination of parameter values with the grid_sweep
+    method, with and without vectorised evaluation, that the joint optimum is
+    found, that every combination receives results (except invalid
+    combinations, for which exceptions are suppressed), that a second grid
+    sweep sharing the same result cache only runs experiments for the invalid
+    combinations, which are not cached, that no call to run_batch receives
+    more than max_batch_rows rows, and that plot_grid saves a heatmap for each
+    pair of parameters
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_grid_sweep", str(vectorise))
+    printer = util.Printer("Console_output.txt", output_dir)
+    cache_filename = os.path.join(output_dir, "cache.sqlite")
+    if os.path.isfile(cache_filename):
+        os.remove(cache_filename)
+
+    class CountingExperiment(SeededExperiment):
+        def __init__(self):
+            self.num_runs = 0
+            self.max_batch_rows = 0
+
+        def run(self, x, y, z):
+            self.num_runs += 1
+            return super().run(x, y) - sq_distance(z, 2)
+
+        def run_batch(self, param_dict_list, seed_list_list):
+            num_rows = sum(len(s) for s in seed_list_list)
+            self.num_runs += num_rows
+            self.max_batch_rows = max(self.max_batch_rows, num_rows)
+            xyz = np.array([[d["x"], d["y"], d["z"]] for d in param_dict_list])
+            sq_dist = np.sum(np.square(xyz - [1, 3, 2]), axis=1, keepdims=True)
+            noise = [
+                [np.random.default_rng(seed).normal() for seed in seed_list]
+                for seed_list in seed_list_list
+            ]
+            return (noise - sq_dist).tolist()
+
+    x_range = list(range(-2, 5))
+    y_range = list(range(0, 6))
+    z_range = [0, 1, 2, 3]
+    grid_size = len(x_range) * len(y_range) * len(z_range)
+    num_invalid = len(set(x_range) & set(y_range)) * len(z_range)
+    n_repeats = 20
+    max_batch_rows = 500
+    for i in range(2):
+        experiment = CountingExperiment()
+        result_cache = sweep.ResultCache(cache_filename)
+        sweeper = sweep.ParamSweeper(
+            experiment=experiment,
+            n_repeats=n_repeats,
+            printer=printer,
+            result_cache=result_cache,
+            vectorise=vectorise,
+        )
+        sweeper.add_parameter(sweep.Parameter("x", 0, x_range))
+        sweeper.add_parameter(sweep.Parameter("y", 0, y_range))
+        sweeper.add_parameter(sweep.Parameter("z", 0, z_range))
+        optimal_param_dict = sweeper.grid_sweep(max_batch_rows)
+        result_cache.close()
+        assert optimal_param_dict == {"x": 1, "y": 3, "z": 2}
+        assert experiment.max_batch_rows <= max_batch_rows
+        assert len(sweeper._params_to_results_dict) == grid_size
+        if i == 0:
+            assert experiment.num_runs == grid_size * n_repeats
+        elif vectorise:
+            assert experiment.num_runs == 0
+        else:
+            assert experiment.num_runs == num_invalid * n_repeats
+
+        for param_tuple, results_list in (
+            sweeper._params_to_results_dict.items()
+        ):
+            param_dict = dict(param_tuple)
+            if (param_dict["x"] == param_dict["y"]) and (not vectorise):
+                assert len(results_list) == 0
+            else:
+                assert len(results_list) == n_repeats
+
+    for param in sweeper._param_list:
+        assert param.default == optimal_param_dict[param.name]
+        assert set(param.val_results_dict.keys()) == set(param.val_range)
+
+    filename_list = sweeper.plot_grid("test_grid_sweep", output_dir)
+    assert len(filename_list) == 3
+    for filename in filename_list:
+        assert os.path.isfile(filename)
+
+    filename_list = sweeper.plot("test_grid_sweep", output_dir)
+    for filename in filename_list:
+        assert os.path.isfile(filename)
+
 def sq_distance(v1, v2):
     return np.sum(np.square(np.array(v1) - np.array(v2)))
@@ -1,4 +1,5 @@
 import os
+import tracemalloc
 import pytest
 import numpy as np
 import util
@@ -25,6 +26,41 @@ def test_result():
     loaded_data = util.Result(output_filename).load()
     assert loaded_data == [1, 2, 12]
 
+def test_array_result():
+    """
+    Test the ArrayResult class, including saving arrays and metadata using the
+    get_context method, loading the arrays as read-only memory-mapped arrays,
+    and loading the arrays fully into memory
+    """
+    output_dir = os.path.join(OUTPUT_DIR, "test_array_result")
+    rng = util.Seeder().get_rng("test_array_result")
+    array_dict = {
+        "0_rewards": rng.normal(size=[20, 30]),
+        "0_optimal": rng.random([20, 30]) > 0.5,
+        "1_rewards": rng.normal(size=[20, 30]).astype(np.float32),
+    }
+    metadata = {"num_steps": 30, "names": ["a", "b"]}
+    result = util.ArrayResult(output_dir, array_dict, metadata)
+    with result.get_context(save=True):
+        array_dict["0_rewards"][3, 4] = 100
+
+    loaded_array_dict, loaded_metadata = util.ArrayResult(output_dir).load()
+    assert loaded_metadata == metadata
+    assert set(loaded_array_dict.keys()) == set(array_dict.keys())
+    for name, array in array_dict.items():
+        loaded_array = loaded_array_dict[name]
+        assert isinstance(loaded_array, np.memmap)
+        assert loaded_array.dtype == array.dtype
+        assert np.all(loaded_array == array)
+
+    assert loaded_array_dict["0_rewards"][3, 4] == 100
+    with pytest.raises(ValueError):
+        loaded_array_dict["0_rewards"][3, 4] = 0
+
+    loaded_array_dict, _ = util.ArrayResult(output_dir).load(mmap_mode=None)
+    assert not isinstance(loaded_array_dict["0_rewards"], np.memmap)
+    assert np.all(loaded_array_dict["0_rewards"] == array_dict["0_rewards"])
+
 def test_exception_context():
     """
     Test the ExceptionContext class, including that expressions are suppressed
@@ -71,6 +107,79 @@ def test_printer():
 
     assert os.path.isfile(os.path.join(OUTPUT_DIR, "test_printer.txt"))
 
+def test_running_statistics():
+    """
+    Test the RunningStatistics class, updating it with a mixture of single
+    samples and batches of samples, and check that the running mean and
+    standard deviation agree with those computed from all of the samples at
+    once
+    """
+    rng = util.Seeder().get_rng("test_running_statistics")
+    x = rng.normal(3, 2, size=[100, 7]).astype(np.float32)
+    stats = util.RunningStatistics(7)
+    for i in range(10):
+        stats.update(x[i])
+    stats.update(x[10:13])
+    stats.update(x[13:])
+
+    assert stats.n == 100
+    assert np.allclose(stats.mean, np.mean(x, axis=0, dtype=np.float64))
+    assert np.allclose(stats.get_std(), np.std(x, axis=0, dtype=np.float64))
+
+def test_phase_timer():
+    """
+    Test the PhaseTimer class, including accumulating times and call counts
+    over multiple calls to the add method, and printing a summary
+    """
+    printer = util.Printer("test_phase_timer.txt", OUTPUT_DIR)
+    phase_timer = util.PhaseTimer()
+    phase_timer.add("a", 0.5)
+    phase_timer.add("b", 1.5, num_calls=10)
+    phase_timer.add("a", 0.25, num_calls=2)
+    phase_timer.print_summary(printer)
+
+    assert phase_timer.get_phase_names() == ["a", "b"]
+    assert phase_timer.get_total_time("a") == 0.75
+    assert phase_timer.get_num_calls("a") == 3
+    assert phase_timer.get_total_time("b") == 1.5
+    assert phase_timer.get_num_calls("b") == 10
+
+def test_progress_reporter():
+    """
+    Test the ProgressReporter class, checking that reports are rate-limited by
+    wall time (with a long print interval, only the final report is printed),
+    and that each report includes the rate, steps per second and ETA
+    """
+    printer = util.Printer("test_progress_reporter.txt", OUTPUT_DIR)
+    summary_list = []
+    progress_reporter = util.ProgressReporter(
+        10,
+        steps_per_item=100,
+        print_interval=1e6,
+        printer=summary_list.append,
+    )
+    for _ in range(10):
+        progress_reporter.update()
+
+    printer(*summary_list, sep="\n")
+    assert len(summary_list) == 1
+    assert summary_list[0].startswith("Completed 10/10 experiments")
+    assert "steps/s" in summary_list[0]
+    assert "ETA = 0.0s" in summary_list[0]
+
+    summary_list = []
+    progress_reporter = util.ProgressReporter(
+        10,
+        print_interval=0,
+        printer=summary_list.append,
+    )
+    for _ in range(5):
+        progress_reporter.update(2)
+
+    printer(*summary_list, sep="\n")
+    assert len(summary_list) == 5
+    assert "steps/s" not in summary_list[0]
+
 def test_seeder():
     """
     Test the Seeder class for generating random seeds and random number
@@ -131,6 +240,66 @@ def test_seeder():
     assert x5.size == 10
     assert not np.all(x4 == x5)
 
+def test_seeder_stateless():
+    """
+    Test the Seeder class initialised with `stateless=True`, that it always
+    returns the same seed for the same arguments (even when called repeatedly
+    on the same instance) without storing any used seeds, that it returns
+    distinct seeds for a large number of different arguments, and that the
+    get_seed_sequence and get_rng methods are reproducible, and that
+    get_seed_sequence gives distinct sequences for distinct spawn keys
+    """
+    seeder = util.Seeder(stateless=True)
+    seeder2 = util.Seeder(stateless=True)
+    assert seeder.get_seed("123") == seeder.get_seed("123")
+    assert seeder.get_seed("123") == seeder2.get_seed("123")
+    assert seeder.get_seed("123") != seeder.get_seed("321")
+    assert seeder.get_seed(1, 2, 3) != seeder.get_seed(3, 2, 1)
+
+    num_seeds = 100000
+    seed_set = set(seeder.get_seed("repeat", i) for i in range(num_seeds))
+    assert len(seed_set) == num_seeds
+    assert len(seeder._used_seeds) == 0
+
+    s1 = seeder.get_seed_sequence("test_seeder_stateless").generate_state(4)
+    s2 = seeder.get_seed_sequence("test_seeder_stateless").generate_state(4)
+    assert np.all(s1 == s2)
+    s3 = seeder.get_seed_sequence("test_seeder_stateless", spawn_key=(1, 2))
+    s4 = seeder.get_seed_sequence("test_seeder_stateless", spawn_key=(2, 1))
+    assert s3.spawn_key == (1, 2)
+    assert not np.all(s3.generate_state(4) == s4.generate_state(4))
+
+    x1 = seeder.get_rng("test_seeder_stateless").normal(size=10)
+    x2 = seeder2.get_rng("test_seeder_stateless").normal(size=10)
+    assert np.all(x1 == x2)
+
+def test_batch_generator():
+    """
+    Test that util.BatchGenerator gives each row the same random numbers as an
+    independent Generator with the same seed, both for the first draw of each
+    shape (which is served directly without allocating a block of random
+    numbers) and for repeated draws served from blocks, and that a single
+    large draw uses memory proportional to the size of the draw
+    """
+    seed_list = list(range(5))
+    batch_rng = util.BatchGenerator(seed_list, block_size=3)
+    rng_list = [np.random.default_rng(seed) for seed in seed_list]
+    x = batch_rng.random([5, 4])
+    assert x.shape == (5, 4)
+    assert np.all(x == np.stack([rng.random(4) for rng in rng_list]))
+    for _ in range(7):
+        x = batch_rng.standard_normal(5)
+        y = np.array([rng.standard_normal() for rng in rng_list])
+        assert x.shape == (5, )
+        assert np.all(x == y)
+
+    batch_rng = util.BatchGenerator(range(200))
+    tracemalloc.start()
+    x = batch_rng.random([200, 1000])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 4 * x.nbytes
+
 def test_is_numeric():
     """
     Test the is_numeric function, and that it returns:
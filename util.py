@@ -23,6 +23,8 @@ SOFTWARE.
 """
 
 import os
+import json
+import hashlib
 import pickle
 import traceback
 import datetime
@@ -56,6 +58,49 @@ class Result:
             self._data = pickle.load(f)
         return self._data
 
+class ArrayResult(Result):
+    def __init__(self, dir_name, array_dict=None, metadata=None):
+        self._dir_name = dir_name
+        self._array_dict = array_dict
+        self._metadata = metadata
+        self._manifest_filename = os.path.join(dir_name, "manifest.json")
+
+    def get_data(self):
+        return self._array_dict, self._metadata
+
+    def save(self):
+        print("\nSaving results data to \"%s\"..." % self._dir_name)
+        if not os.path.isdir(self._dir_name):
+            os.makedirs(self._dir_name)
+
+        array_filename_dict = dict()
+        for name, array in self._array_dict.items():
+            array_filename = "%s.npy" % clean_filename(name)
+            np.save(os.path.join(self._dir_name, array_filename), array)
+            array_filename_dict[name] = array_filename
+
+        manifest = {
+            "metadata": self._metadata,
+            "arrays": array_filename_dict,
+        }
+        with open(self._manifest_filename, "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    def load(self, mmap_mode="r"):
+        print("Loading results data from \"%s\"..." % self._dir_name)
+        with open(self._manifest_filename, "r") as f:
+            manifest = json.load(f)
+
+        self._metadata = manifest["metadata"]
+        self._array_dict = {
+            name: np.load(
+                os.path.join(self._dir_name, array_filename),
+                mmap_mode=mmap_mode,
+            )
+            for name, array_filename in manifest["arrays"].items()
+        }
+        return self._array_dict, self._metadata
+
 class ResultSavingContext:
     def __init__(self, result, save, suppress_exceptions):
         self._result = result
@@ -123,11 +168,143 @@ class Printer:
         if self._file is not None:
             self._file.close()
 
-class Seeder:
+class RunningStatistics:
+    def __init__(self, size):
+        self.n = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def update(self, x):
+        x = np.reshape(x, [-1, self.mean.size])
+        n_x = x.shape[0]
+        mean_x = np.mean(x, axis=0, dtype=np.float64)
+        m2_x = np.sum(np.square(x - mean_x), axis=0)
+
+        n = self.n + n_x
+        delta = mean_x - self.mean
+        self.mean += delta * (n_x / n)
+        self.m2 += m2_x + np.square(delta) * (self.n * n_x / n)
+        self.n = n
+
+    def get_var(self):
+        return self.m2 / self.n
+
+    def get_std(self):
+        return np.sqrt(self.get_var())
+
+class PhaseTimer:
     def __init__(self):
+        self._total_time_dict = dict()
+        self._num_calls_dict = dict()
+
+    def add(self, phase_name, t, num_calls=1):
+        if phase_name not in self._total_time_dict:
+            self._total_time_dict[phase_name] = 0
+            self._num_calls_dict[phase_name] = 0
+
+        self._total_time_dict[phase_name] += t
+        self._num_calls_dict[phase_name] += num_calls
+
+    def get_total_time(self, phase_name):
+        return self._total_time_dict[phase_name]
+
+    def get_num_calls(self, phase_name):
+        return self._num_calls_dict[phase_name]
+
+    def get_phase_names(self):
+        return list(self._total_time_dict.keys())
+
+    def print_summary(self, printer=None):
+        if printer is None:
+            printer = Printer()
+
+        t_total = sum(self._total_time_dict.values())
+        for phase_name in self.get_phase_names():
+            t = self._total_time_dict[phase_name]
+            num_calls = self._num_calls_dict[phase_name]
+            printer(
+                "%-15s total = %8.3fs (%5.1f%%), calls = %-9i "
+                "mean = %9.2f us"
+                % (
+                    phase_name,
+                    t,
+                    100 * t / t_total if t_total > 0 else 0,
+                    num_calls,
+                    1e6 * t / num_calls if num_calls > 0 else 0,
+                )
+            )
+
+class ProgressReporter:
+    def __init__(
+        self,
+        total,
+        name="experiments",
+        steps_per_item=None,
+        print_interval=1.0,
+        printer=None,
+    ):
+        self._total = total
+        self._name = name
+        self._steps_per_item = steps_per_item
+        self._print_interval = print_interval
+        if printer is None:
+            printer = Printer()
+        self._print = printer
+
+        self._n = 0
+        self._t_start = time.perf_counter()
+        self._t_last_print = self._t_start
+
+    def update(self, n=1):
+        self._n += n
+        t = time.perf_counter()
+        if (
+            ((t - self._t_last_print) >= self._print_interval)
+            or (self._n >= self._total)
+        ):
+            self._t_last_print = t
+            self._print(self.get_summary(t))
+
+    def get_summary(self, t=None):
+        if t is None:
+            t = time.perf_counter()
+
+        t_elapsed = t - self._t_start
+        if t_elapsed > 0:
+            rate = self._n / t_elapsed
+        else:
+            rate = 0
+
+        summary = (
+            "Completed %i/%i %s (%5.1f%%), %.3g %s/s"
+            % (
+                self._n,
+                self._total,
+                self._name,
+                100 * self._n / max(self._total, 1),
+                rate,
+                self._name,
+            )
+        )
+        if self._steps_per_item is not None:
+            summary += ", %.3g steps/s" % (rate * self._steps_per_item)
+
+        summary += ", elapsed time = %.1fs" % t_elapsed
+        if rate > 0:
+            summary += ", ETA = %.1fs" % ((self._total - self._n) / rate)
+
+        return summary
+
+class Seeder:
+    def __init__(self, stateless=False):
+        self._stateless = stateless
         self._used_seeds = set()
 
     def get_seed(self, *args):
+        if self._stateless:
+            digest = hashlib.sha256(str(args).encode()).digest()
+            return int.from_bytes(digest[:16], "little")
+
         seed = sum((i + 1) * ord(c) for i, c in enumerate(str(args)))
         while seed in self._used_seeds:
             seed += 1
@@ -135,11 +312,69 @@ class Seeder:
         self._used_seeds.add(seed)
         return seed
 
+    def get_seed_sequence(self, *args, spawn_key=()):
+        return np.random.SeedSequence(
+            self.get_seed(*args),
+            spawn_key=spawn_key,
+        )
+
     def get_rng(self, *args):
         seed = self.get_seed(*args)
         rng = np.random.default_rng(seed)
         return rng
 
+class BatchGenerator:
+    def __init__(self, seed_list, block_size=200):
+        self._rng_list = [np.random.default_rng(seed) for seed in seed_list]
+        self._block_size = block_size
+        self._buffer_dict = dict()
+
+    def random(self, size):
+        return self._draw("random", size)
+
+    def standard_normal(self, size):
+        return self._draw("standard_normal", size)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        if size is None:
+            size = np.broadcast_shapes(np.shape(loc), np.shape(scale))
+
+        return loc + scale * self.standard_normal(size)
+
+    def integers(self, high, size):
+        u = self.random(size)
+        return np.minimum(np.floor(u * high), high - 1).astype(np.int64)
+
+    def _draw(self, method_name, size):
+        size = tuple(np.atleast_1d(size).tolist())
+        if size[0] != len(self._rng_list):
+            raise ValueError(
+                "The first dimension of size must be equal to the number of "
+                "rows (%i), but received size = %s"
+                % (len(self._rng_list), size)
+            )
+
+        key = (method_name, size[1:])
+        if key not in self._buffer_dict:
+            self._buffer_dict[key] = [None, self._block_size]
+            return np.stack(
+                [getattr(rng, method_name)(size[1:]) for rng in self._rng_list]
+            )
+
+        buffer = self._buffer_dict[key]
+        if buffer[1] >= self._block_size:
+            if buffer[0] is None:
+                buffer[0] = np.empty(
+                    (size[0], self._block_size) + size[1:]
+                )
+            for i, rng in enumerate(self._rng_list):
+                getattr(rng, method_name)(out=buffer[0][i])
+            buffer[1] = 0
+
+        x = buffer[0][:, buffer[1]]
+        buffer[1] += 1
+        return x
+
 def time_func(func, *args, **kwargs):
     t_start = time.perf_counter()
     func(*args, **kwargs)